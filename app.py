@@ -1,8 +1,180 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import io
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
 import numpy as np
+from scipy.stats import kurtosis, skew
+
+# Above this many plotted samples SVG rendering becomes the bottleneck and the
+# WebGL trace type is used instead (cf. plotly's own ~15k point guidance).
+WEBGL_POINT_THRESHOLD = 15000
+
+# Beyond this many signals, traces sharing a color are merged into a single
+# NaN-separated trace since plotly.js cost grows with the number of traces.
+MAX_STYLED_TRACES = 8
+
+# Number of samples kept per trace after LTTB downsampling.
+DOWNSAMPLE_POINTS = 2000
+
+# Maximum number of signals (subplot rows) per distribution/box plot figure;
+# larger selections are split over several figures of bounded height.
+STATS_ROWS_PER_FIGURE = 8
+
+# Minimum number of selected samples before the histograms are binned on a
+# thread pool; below it the dispatch costs about as much as the binning.
+PARALLEL_STATS_MIN_SAMPLES = 4_000_000
+
+@st.cache_data(show_spinner=False)
+def _parse_csv(raw: bytes) -> pd.DataFrame:
+    """Parse uploaded CSV bytes, memoized so reruns skip re-parsing the same file."""
+    df = pd.read_csv(io.BytesIO(raw), engine="pyarrow")
+    # Signal columns are stored as float32; the last column (label) keeps its inferred type.
+    # The columns are picked by position, as pyarrow keeps duplicate headers
+    return pd.concat([df.iloc[:, :-1].astype(np.float32), df.iloc[:, -1]], axis=1)
+
+def _bin_signals(rows):
+    """Bin each row of a 2-D block into a 50-bin histogram, as (counts, edges) pairs."""
+    # Bin on the server so only the 50 counts are sent, not every sample
+    # (np.histogram rejects NaNs, which the browser-side binning skipped)
+    return [np.histogram(row[~np.isnan(row)], bins=50) for row in rows]
+
+def _build_signal_traces(signal_data, signal_idx, counts, edges):
+    """Build the distribution (pre-binned bar) and box traces of one signal."""
+    histogram = go.Bar(
+        x=0.5 * (edges[:-1] + edges[1:]),
+        y=counts,
+        width=edges[1] - edges[0],
+        name=f"Signal {signal_idx + 1}"
+    )
+    box = go.Box(
+        y=signal_data,
+        name=f"Signal {signal_idx + 1}"
+    )
+    return histogram, box
+
+def _lttb(block, n_out):
+    """Downsample each row of a 2-D array with Largest-Triangle-Three-Buckets.
+
+    Returns the kept sample indices and their values, both shaped (rows, n_out).
+    """
+    rows, length = block.shape
+    if length <= n_out:
+        return np.broadcast_to(np.arange(length), block.shape), block
+
+    # First and last samples are always kept; the rest is split into n_out - 2 buckets
+    edges = np.floor(np.linspace(1, length - 1, n_out - 1)).astype(np.intp)
+    row_ids = np.arange(rows)
+    indices = np.empty((rows, n_out), dtype=np.intp)
+    indices[:, 0] = 0
+    indices[:, -1] = length - 1
+
+    selected = np.zeros(rows, dtype=np.intp)
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_stop = length - 1, length
+
+        # Third triangle vertex: the average of the next bucket
+        avg_x = (next_start + next_stop - 1) / 2
+        avg_y = block[:, next_start:next_stop].mean(axis=1)
+        prev_x = selected
+        prev_y = block[row_ids, selected]
+
+        # Keep the point forming the largest triangle with the previous pick and that average
+        bucket_x = np.arange(start, stop)
+        area = np.abs(
+            (prev_x - avg_x)[:, None] * (block[:, start:stop] - prev_y[:, None])
+            - (prev_x[:, None] - bucket_x) * (avg_y - prev_y)[:, None]
+        )
+        selected = start + area.argmax(axis=1)
+        indices[:, i + 1] = selected
+
+    return indices, np.take_along_axis(block, indices, axis=1)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _build_plot(data_key, selected_signals, background, grid, default_colors, _signals, _labels):
+    """Build the comparison figure of the selected signals.
+
+    The signal and label arrays are not hashed (leading underscore); ``data_key``
+    identifies the uploaded file they were loaded from instead.
+    """
+    colors = list(islice(cycle(default_colors), len(selected_signals)))
+    
+    line_styles = [
+        dict(width=1.5),                     # solid
+        dict(width=1.5, dash='dash'),        # dashed
+        dict(width=1.5, dash='dot'),         # dotted
+        dict(width=1.5, dash='dashdot'),     # dash-dot
+        dict(width=1.5, dash='longdash'),    # long dash
+    ]
+    
+    # Downsample long signals so the browser only receives what it can display
+    sample_x, sample_y = _lttb(_signals[list(selected_signals)], DOWNSAMPLE_POINTS)
+    
+    # Use WebGL only for large plots to avoid the context overhead on tiny ones
+    scatter_cls = go.Scattergl if sample_y.size > WEBGL_POINT_THRESHOLD else go.Scatter
+    
+    # Collect every trace first and hand them to the Figure in one validation pass
+    traces = []
+    if len(selected_signals) > MAX_STYLED_TRACES:
+        num_groups = min(len(default_colors), len(sample_y))
+        
+        for group in range(num_groups):
+            # Signals are colored round-robin, so every num_groups-th row shares a color
+            rows_x = sample_x[group::num_groups]
+            rows_y = sample_y[group::num_groups]
+            members = selected_signals[group::num_groups]
+            # Append a NaN column so plotly breaks the line between consecutive signals
+            separator = np.full((len(rows_y), 1), np.nan)
+            x = np.hstack([rows_x, separator]).ravel()
+            y = np.hstack([rows_y, separator]).ravel()
+            
+            traces.append(scatter_cls(
+                x=x,
+                y=y,
+                mode='lines',
+                name=f'{len(members)} signals (from Signal {members[0] + 1})',
+                line=dict(color=colors[group], width=1.5)
+            ))
+    else:
+        for idx, signal_idx in enumerate(selected_signals):
+            label = _labels[signal_idx]
+            
+            style_idx = idx % len(line_styles)
+            
+            traces.append(scatter_cls(
+                x=sample_x[idx],
+                y=sample_y[idx],
+                name=f'Signal {signal_idx + 1} (Label: {label})',
+                line=dict(color=colors[idx], **line_styles[style_idx])
+            ))
+    
+    if len(selected_signals) > 1:
+        title = 'Comparison: ' + ' vs '.join([f'Signal {s + 1}' for s in selected_signals])
+    else:
+        title = f'Signal {selected_signals[0] + 1}'
+    
+    return go.Figure(
+        data=traces,
+        layout=go.Layout(
+            title=title,
+            xaxis_title=' ',
+            yaxis_title='Signal Amplitude',
+            showlegend=True,
+            height=600,
+            plot_bgcolor=background,
+            paper_bgcolor=background,
+            xaxis=dict(gridcolor=grid),
+            yaxis=dict(gridcolor=grid)
+        )
+    )
 
 class ECGComparerWebApp:
     def __init__(self):
@@ -20,7 +192,15 @@ class ECGComparerWebApp:
         if 'selected_signals' not in st.session_state:
             st.session_state.selected_signals = []
         if 'all_signals' not in st.session_state:
-            st.session_state.all_signals = []
+            st.session_state.all_signals = np.arange(0, dtype=np.int32)
+        if 'signals_np' not in st.session_state:
+            st.session_state.signals_np = None
+        if 'labels' not in st.session_state:
+            st.session_state.labels = None
+        if 'data_key' not in st.session_state:
+            st.session_state.data_key = None
+        if 'rng' not in st.session_state:
+            st.session_state.rng = np.random.default_rng()
         if 'plot_colors' not in st.session_state:
             st.session_state.plot_colors = {
                 'background': '#000000',
@@ -38,27 +218,16 @@ class ECGComparerWebApp:
         with st.sidebar:
             st.header("Controls")
             
-            # Create tabs in sidebar
-            tab_data, tab_appearance = st.tabs(["📊 Data", "🎨 Appearance"])
+            uploaded_file = st.file_uploader("Upload CSV File", type=['csv'])
             
-            with tab_data:
-                uploaded_file = st.file_uploader("Upload CSV File", type=['csv'])
+            if uploaded_file is not None:
+                self.load_csv(uploaded_file)
                 
-                if uploaded_file is not None:
-                    self.load_csv(uploaded_file)
+                if st.session_state.data is not None:
+                    self.signal_selector()
                     
-                    if st.session_state.data is not None:
-                        self.signal_selector()
-                        
-                    if st.button("Clear Plot"):
-                        st.session_state.selected_signals = []
-            
-            with tab_appearance:
-                st.subheader("Color Settings")
-                st.session_state.plot_colors['background'] = st.color_picker(
-                    "Background Color", 
-                    st.session_state.plot_colors['background']
-                )
+                if st.button("Clear Plot"):
+                    st.session_state.selected_signals = []
 
         # Create tabs for Plot and Statistics
         tab1, tab2 = st.tabs(["📈 Plot View", "📊 Statistics View"])
@@ -66,7 +235,7 @@ class ECGComparerWebApp:
         # Plot tab
         with tab1:
             if st.session_state.data is not None:
-                self.display_plot()
+                self.plot_fragment()
         
         # Statistics tab
         with tab2:
@@ -75,15 +244,21 @@ class ECGComparerWebApp:
 
     def load_csv(self, uploaded_file):
         try:
-            st.session_state.data = pd.read_csv(uploaded_file)
-            st.session_state.all_signals = list(range(len(st.session_state.data)))
+            st.session_state.data = _parse_csv(uploaded_file.getvalue())
+            # Materialize the signal matrix and labels once; rendering indexes these by row
+            st.session_state.signals_np = st.session_state.data.iloc[:, :-1].to_numpy(
+                dtype=np.float32, copy=False
+            )
+            st.session_state.labels = st.session_state.data.iloc[:, -1].to_numpy()
+            st.session_state.data_key = uploaded_file.file_id
+            st.session_state.all_signals = np.arange(len(st.session_state.data), dtype=np.int32)
             st.success("CSV file loaded successfully!")
         except Exception as e:
             st.error(f"Error loading file: {str(e)}")
 
     def signal_selector(self):
         # Show available classes
-        unique_labels = st.session_state.data.iloc[:, -1].unique()
+        unique_labels = pd.unique(st.session_state.labels)
         if st.button("Show Available Classes"):
             st.write("Available Classes:", unique_labels)
         
@@ -97,92 +272,81 @@ class ECGComparerWebApp:
         # Add button to plot all signals from selected class
         if st.button("Plot Signals by Class"):
             if selected_class == 'All':
-                st.session_state.selected_signals = st.session_state.all_signals
+                st.session_state.selected_signals = st.session_state.all_signals.tolist()
             else:
                 # Get indices of signals from selected class
-                class_indices = st.session_state.data[st.session_state.data.iloc[:, -1] == selected_class].index.tolist()
+                class_indices = np.flatnonzero(st.session_state.labels == selected_class).tolist()
                 st.session_state.selected_signals = class_indices
         
         # Add number input for random signal selection
         num_signals_to_plot = st.number_input(
             "Number of random signals to plot",
             min_value=1,
-            max_value=len(st.session_state.all_signals),
+            max_value=st.session_state.all_signals.size,
             value=1
         )
         
         # Add button to plot random signals
         if st.button("Plot Random Signals"):
-            # Randomly select the specified number of signals
-            st.session_state.selected_signals = np.random.choice(
-                st.session_state.all_signals,
+            # Randomly select the specified number of signals; the Generator samples
+            # without replacement in O(k) instead of permuting all N indices
+            st.session_state.selected_signals = st.session_state.rng.choice(
+                st.session_state.all_signals.size,
                 size=num_signals_to_plot,
-                replace=False  # Ensures no signal is selected twice
+                replace=False,  # Ensures no signal is selected twice
+                shuffle=False
             ).tolist()
         
         # Add button to plot all signals
         if st.button("Plot All Signals"):
-            st.session_state.selected_signals = st.session_state.all_signals
+            st.session_state.selected_signals = st.session_state.all_signals.tolist()
         
+        # Integer options avoid formatting and re-parsing a label per signal on every rerun
         selected_signals = st.multiselect(
             "Select signals to compare",
-            options=[f"Signal {i+1}" for i in st.session_state.all_signals],
-            default=[f"Signal {i+1}" for i in st.session_state.selected_signals]
+            options=st.session_state.all_signals,
+            default=st.session_state.selected_signals,
+            format_func=lambda i: f"Signal {i+1}"
         )
 
-        if selected_signals != [f"Signal {i+1}" for i in st.session_state.selected_signals]:
-            st.session_state.selected_signals = [int(s.split()[1]) - 1 for s in selected_signals]
+        if selected_signals != st.session_state.selected_signals:
+            st.session_state.selected_signals = selected_signals
 
         if st.button("Switch Diagram"):
             st.session_state.selected_signals = []
 
+    @st.fragment
+    def plot_fragment(self):
+        # Appearance settings sit in the same fragment as the plot, so changing
+        # them reruns only the plot instead of the whole script (CSV load, stats)
+        with st.expander("🎨 Appearance"):
+            st.subheader("Color Settings")
+            st.session_state.plot_colors['background'] = st.color_picker(
+                "Background Color", 
+                st.session_state.plot_colors['background']
+            )
+        
+        self.display_plot()
+
     def display_plot(self):
         if not st.session_state.selected_signals:
             st.info("Please select a signal to plot.")
             return
 
-        fig = go.Figure()
-        
-        default_colors = st.session_state.plot_colors['default_colors']
-        colors = []
-        for i in range(len(st.session_state.selected_signals)):
-            colors.append(default_colors[i % len(default_colors)])
-        
-        line_styles = [
-            dict(width=1.5),                     # solid
-            dict(width=1.5, dash='dash'),        # dashed
-            dict(width=1.5, dash='dot'),         # dotted
-            dict(width=1.5, dash='dashdot'),     # dash-dot
-            dict(width=1.5, dash='longdash'),    # long dash
-        ]
-        
-        for idx, signal_idx in enumerate(st.session_state.selected_signals):
-            signal_data = st.session_state.data.iloc[signal_idx, :-1].values
-            label = st.session_state.data.iloc[signal_idx, -1]
-            
-            style_idx = idx % len(line_styles)
-            
-            fig.add_trace(go.Scatter(
-                y=signal_data,
-                name=f'Signal {signal_idx + 1} (Label: {label})',
-                line=dict(color=colors[idx], **line_styles[style_idx])
-            ))
-        
-        if len(st.session_state.selected_signals) > 1:
-            title = 'Comparison: ' + ' vs '.join([f'Signal {s + 1}' for s in st.session_state.selected_signals])
-        else:
-            title = f'Signal {st.session_state.selected_signals[0] + 1}'
+        if len(st.session_state.selected_signals) > MAX_STYLED_TRACES:
+            st.caption("Many-signals mode: signals sharing a color are drawn as one trace "
+                       "and line-style variation is disabled.")
         
-        fig.update_layout(
-            title=title,
-            xaxis_title=' ',
-            yaxis_title='Signal Amplitude',
-            showlegend=True,
-            height=600,
-            plot_bgcolor=st.session_state.plot_colors['background'],
-            paper_bgcolor=st.session_state.plot_colors['background'],
-            xaxis=dict(gridcolor=st.session_state.plot_colors['grid']),
-            yaxis=dict(gridcolor=st.session_state.plot_colors['grid'])
+        # Reruns that leave the data, selection and colors unchanged (e.g. switching
+        # tabs) reuse the cached figure instead of rebuilding it
+        fig = _build_plot(
+            st.session_state.data_key,
+            tuple(st.session_state.selected_signals),
+            st.session_state.plot_colors['background'],
+            st.session_state.plot_colors['grid'],
+            tuple(st.session_state.plot_colors['default_colors']),
+            st.session_state.signals_np,
+            st.session_state.labels
         )
         
         st.plotly_chart(fig, use_container_width=True)
@@ -196,92 +360,115 @@ class ECGComparerWebApp:
         # Store all statistics for download
         all_stats_data = {}
         
-        # Display statistics for each signal
+        # Extract all selected signals (excluding the label column) in one slice
+        block = st.session_state.signals_np[st.session_state.selected_signals]
+        
+        # Compute every statistic for all signals at once, one row per signal
+        means = block.mean(axis=1)
+        medians = np.median(block, axis=1)
+        stds = block.std(axis=1)
+        mins = block.min(axis=1)
+        maxs = block.max(axis=1)
+        # bias=False matches the unbiased estimators pandas uses for skew/kurtosis
+        skews = skew(block, axis=1, bias=False)
+        kurtoses = kurtosis(block, axis=1, bias=False)
+        
+        # Write the statistics CSV of every signal into one buffer; each signal's
+        # download is then a slice of it rather than a separate to_csv call
+        csv_buffer = io.StringIO()
+        csv_writer = csv.writer(csv_buffer, lineterminator='\n')
+        csv_offsets = []
         for idx, signal_idx in enumerate(st.session_state.selected_signals):
-            # Get signal data excluding the last column (label)
-            signal_data = st.session_state.data.iloc[signal_idx, :-1].values
-            
-            st.subheader(f"Statistics for Signal {signal_idx + 1}")
-            
             # Basic statistics
             stats = {
-                "Mean": signal_data.mean(),
-                "Median": np.median(signal_data),
-                "Std Dev": signal_data.std(),
-                "Min": signal_data.min(),
-                "Max": signal_data.max(),
-                "Range": signal_data.max() - signal_data.min(),
-                "Skewness": pd.Series(signal_data).skew(),
-                "Kurtosis": pd.Series(signal_data).kurtosis(),
+                "Mean": means[idx],
+                "Median": medians[idx],
+                "Std Dev": stds[idx],
+                "Min": mins[idx],
+                "Max": maxs[idx],
+                "Range": maxs[idx] - mins[idx],
+                "Skewness": skews[idx],
+                "Kurtosis": kurtoses[idx],
             }
             
             # Store statistics for this signal
             signal_key = f"Signal {signal_idx + 1}"
             all_stats_data[signal_key] = stats
             
+            start = csv_buffer.tell()
+            csv_writer.writerow(['Metric', 'Value'])
+            csv_writer.writerows((metric, round(float(value), 4)) for metric, value in stats.items())
+            csv_offsets.append((start, csv_buffer.tell()))
+        stats_csv = csv_buffer.getvalue()
+        
+        # Display statistics for each signal
+        for idx, signal_idx in enumerate(st.session_state.selected_signals):
+            st.subheader(f"Statistics for Signal {signal_idx + 1}")
+            
             # Create a DataFrame for better formatting
             stats_df = pd.DataFrame(
-                stats.items(),
+                all_stats_data[f"Signal {signal_idx + 1}"].items(),
                 columns=['Metric', 'Value']
             )
             stats_df['Value'] = stats_df['Value'].round(4)
             st.dataframe(stats_df, hide_index=True)
             
             # Add download button for individual signal statistics
-            csv = stats_df.to_csv(index=False)
+            start, end = csv_offsets[idx]
             st.download_button(
                 label=f"Download Signal {signal_idx + 1} Statistics",
-                data=csv,
+                data=stats_csv[start:end],
                 file_name=f'signal_{signal_idx + 1}_statistics.csv',
                 mime='text/csv',
             )
             
-            # Additional statistical visualizations
-            col1, col2 = st.columns(2)
+            st.divider()  # Add a visual separator between signals
+        
+        # Additional statistical visualizations: a distribution/box plot row per
+        # signal, STATS_ROWS_PER_FIGURE rows to a figure instead of two figures each
+        st.header("Distribution and Box Plots")
+        # The binning is NumPy work that mostly runs without the GIL, so large
+        # selections on a multi-core machine are binned in one batch of rows per
+        # worker thread. The Plotly traces hold the GIL and are built serially
+        workers = min(os.cpu_count() or 1, num_signals)
+        if workers > 1 and block.size >= PARALLEL_STATS_MIN_SAMPLES:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                histograms = [histogram for batch in executor.map(_bin_signals, np.array_split(block, workers))
+                              for histogram in batch]
+        else:
+            histograms = _bin_signals(block)
+        signal_traces = [_build_signal_traces(signal_data, signal_idx, counts, edges)
+                         for signal_data, signal_idx, (counts, edges)
+                         in zip(block, st.session_state.selected_signals, histograms)]
+        
+        for first in range(0, num_signals, STATS_ROWS_PER_FIGURE):
+            figure_signals = st.session_state.selected_signals[first:first + STATS_ROWS_PER_FIGURE]
+            figure_traces = signal_traces[first:first + STATS_ROWS_PER_FIGURE]
+            num_rows = len(figure_signals)
             
-            with col1:
-                st.subheader("Distribution Plot")
-                fig = go.Figure()
-                fig.add_trace(go.Histogram(
-                    x=signal_data,
-                    nbinsx=50,
-                    name=f"Signal {signal_idx + 1}"
-                ))
-                fig.update_layout(
-                    title=f"Distribution of Signal {signal_idx + 1}",
-                    xaxis_title="Value",
-                    yaxis_title="Frequency",
-                    showlegend=True,
-                    height=300
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            subplot_titles = []
+            for signal_idx in figure_signals:
+                subplot_titles += [f"Distribution of Signal {signal_idx + 1}",
+                                   f"Box Plot of Signal {signal_idx + 1}"]
+            fig = make_subplots(rows=num_rows, cols=2, subplot_titles=subplot_titles)
             
-            with col2:
-                st.subheader("Box Plot")
-                fig = go.Figure()
-                fig.add_trace(go.Box(
-                    y=signal_data,
-                    name=f"Signal {signal_idx + 1}"
-                ))
-                fig.update_layout(
-                    title=f"Box Plot of Signal {signal_idx + 1}",
-                    height=300
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            fig.add_traces(
+                [trace for pair in figure_traces for trace in pair],
+                rows=[row for row in range(1, num_rows + 1) for _ in range(2)],
+                cols=[1, 2] * num_rows
+            )
             
-            st.divider()  # Add a visual separator between signals
+            fig.update_xaxes(title_text="Value", col=1)
+            fig.update_yaxes(title_text="Frequency", col=1)
+            fig.update_layout(showlegend=False, height=300 * num_rows)
+            st.plotly_chart(fig, use_container_width=True)
         
         # Add correlation analysis for pairs of signals
         if num_signals > 1:
             st.header("Correlation Analysis")
             
-            # Create correlation matrix
-            correlation_matrix = np.zeros((num_signals, num_signals))
-            for i in range(num_signals):
-                for j in range(num_signals):
-                    signal1 = st.session_state.data.iloc[st.session_state.selected_signals[i], :-1].values
-                    signal2 = st.session_state.data.iloc[st.session_state.selected_signals[j], :-1].values
-                    correlation_matrix[i, j] = np.corrcoef(signal1, signal2)[0, 1]
+            # Create correlation matrix (rows of block are the variables)
+            correlation_matrix = np.corrcoef(block)
             
             # Display correlation matrix
             correlation_df = pd.DataFrame(
@@ -298,19 +485,11 @@ class ECGComparerWebApp:
         # Add download button for all statistics
         st.header("Download All Statistics")
         
-        # Convert all statistics to DataFrame
-        all_stats_df = pd.DataFrame()
-        for signal_name, stats in all_stats_data.items():
-            if signal_name != 'Correlation Matrix':
-                temp_df = pd.DataFrame(stats.items(), columns=['Metric', signal_name])
-                if all_stats_df.empty:
-                    all_stats_df = temp_df
-                else:
-                    all_stats_df = all_stats_df.merge(
-                        temp_df, 
-                        on='Metric', 
-                        how='outer'
-                    )
+        # Convert all statistics to DataFrame in one step: one column per signal,
+        # one row per metric, rather than merging a frame per signal
+        signal_stats = {name: stats for name, stats in all_stats_data.items()
+                        if name != 'Correlation Matrix'}
+        all_stats_df = pd.DataFrame(signal_stats).rename_axis('Metric').reset_index()
         
         # Create download buttons
         csv_all = all_stats_df.to_csv(index=False)
@@ -10,59 +10,359 @@ import pandas as pd
 import cv2
 import numpy as np
 from PIL import Image, ImageQt
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, 
                            QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
-                           QLineEdit, QLabel, QFrame, QStatusBar, 
-                           QToolButton, QMenu, QAction, QStackedWidget,
+                           QLineEdit, QLabel, QFrame, QStackedWidget,
                            QGraphicsView, QGraphicsScene, QFileDialog,
                            QMessageBox, QDialog, QComboBox, QSizePolicy,
-                           QRubberBand)
-from PyQt5.QtCore import Qt, QSize, QTimer, QRectF, QRect
-from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPixmap, QImage, QPainter, QPen, QBrush
+                           QOpenGLWidget)
+from PyQt5.QtCore import Qt, QRectF, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import (QFont, QColor, QPixmap, QImage, QPainter, QPen, QBrush,
+                         QTextCursor, QTextBlockFormat, QTextCharFormat)
+# Imported after PyQt5, so pyqtgraph uses the binding already loaded by the app
+import pyqtgraph as pg
 import os
-import csv
-
-# Import necessary variables and functions from test3.py
-rectangles = []
-drawing = False
-ix, iy = -1, -1
-current_rectangle = None
-selected_rectangle = None
-img = None
-img_original_size = (0, 0)
-img_resized_size = (1260, 900)
-image_loaded = False
-opened_image_path = None
-zoom_factor = 1.0
-zoom_step = 0.3
-min_zoom = 1.0
-max_zoom = 4.0
-rotation_angle = 0
-offset_x = offset_y = 0
-
-# Add these to the global variables at the top
-rectangle_history = []
-current_history_index = -1
+import html
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Make sure OpenCV uses its SIMD code paths and all cores for the image pipelines
+cv2.setUseOptimized(True)
+cv2.setNumThreads(os.cpu_count() or 1)
+
+# numba is optional; without it the OpenCV/NumPy paths are used
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Undo history keeps at most MAX_HISTORY snapshots per page; a snapshot is a
+# tuple of the (immutable) rectangle tuples, so taking one copies no rectangle
+# and undo/redo snapshots can be shared
+MAX_HISTORY = 100
+
+# Oldest chat lines are dropped past this many blocks
+MAX_CHAT_BLOCKS = 2000
+
+# Constant stylesheets, built once and shared by every widget instance
+QUICK_ACTION_BUTTON_STYLE = """
+    QPushButton {
+        background-color: %s;
+        color: white;
+        border: none;
+        border-radius: 15px;
+        padding: 8px 20px;
+        font-size: 13px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: %sDD;
+    }
+"""
+
+CHAT_HEADER_STYLE = """
+    QFrame {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
+                                  stop:0 #2C3E50, stop:1 #3498DB);
+        border-top-left-radius: 15px;
+        border-top-right-radius: 15px;
+        border-bottom: 2px solid rgba(255, 255, 255, 0.1);
+    }
+"""
+
+CHAT_ICON_CONTAINER_STYLE = """
+    QFrame {
+        background: rgba(255, 255, 255, 0.1);
+        border-radius: 25px;
+        padding: 8px;
+    }
+"""
+
+CHAT_TITLE_STYLE = """
+    color: white;
+    font-size: 18px;
+    font-weight: bold;
+"""
+
+CHAT_STATUS_STYLE = """
+    color: #2ECC71;
+    font-size: 13px;
+"""
+
+CHAT_SETTINGS_BUTTON_STYLE = """
+    QPushButton {
+        color: white;
+        background: transparent;
+        border: none;
+        padding: 5px;
+        border-radius: 15px;
+    }
+    QPushButton:hover {
+        background: rgba(255, 255, 255, 0.1);
+    }
+"""
+
+CHAT_CONTAINER_STYLE = """
+    QFrame {
+        background: white;
+        border: none;
+    }
+"""
+
+CHAT_DISPLAY_STYLE = """
+    QTextEdit {
+        background-color: white;
+        border: none;
+        padding: 20px;
+        font-size: 14px;
+    }
+    QScrollBar:vertical {
+        border: none;
+        background: #F0F0F0;
+        width: 10px;
+        margin: 0px;
+    }
+    QScrollBar::handle:vertical {
+        background: #BDBDBD;
+        border-radius: 5px;
+        min-height: 20px;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+"""
+
+CHAT_INPUT_FRAME_STYLE = """
+    QFrame {
+        background: white;
+        border-bottom-left-radius: 15px;
+        border-bottom-right-radius: 15px;
+        padding: 15px;
+        border-top: 1px solid #E0E0E0;
+    }
+"""
+
+CHAT_INPUT_FIELD_STYLE = """
+    QLineEdit {
+        border: 2px solid #E0E0E0;
+        border-radius: 20px;
+        padding: 10px 15px;
+        font-size: 14px;
+        background: white;
+    }
+    QLineEdit:focus {
+        border-color: #3498DB;
+    }
+"""
+
+CHAT_SEND_BUTTON_STYLE = """
+    QPushButton {
+        background-color: #3498DB;
+        color: white;
+        border-radius: 20px;
+        border: none;
+    }
+    QPushButton:hover {
+        background-color: #2980B9;
+    }
+    QPushButton:pressed {
+        background-color: #2475A8;
+    }
+"""
+
+INPUT_DIALOG_STYLE = """
+    QDialog {
+        background-color: white;
+        border-radius: 10px;
+    }
+    QLabel {
+        font-size: 14px;
+        color: #2C3E50;
+    }
+    QLineEdit {
+        padding: 8px;
+        border: 2px solid #BDC3C7;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    QLineEdit:focus {
+        border-color: #3498DB;
+    }
+    QPushButton {
+        padding: 8px 16px;
+        background-color: #3498DB;
+        color: white;
+        border: none;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    QPushButton:hover {
+        background-color: #2980B9;
+    }
+"""
+
+INPUT_DIALOG_CANCEL_STYLE = """
+    QPushButton {
+        background-color: #E74C3C;
+    }
+    QPushButton:hover {
+        background-color: #C0392B;
+    }
+"""
+
+ECG_LEFT_PANEL_STYLE = """
+    QFrame {
+        background-color: #2C3E50;
+        border: none;
+        min-width: 200px;
+        max-width: 300px;
+    }
+    QPushButton#toolButton {
+        background-color: #34495E;
+        color: white;
+        border: none;
+        border-radius: 8px;
+        padding: 12px;
+        font-size: 14px;
+        text-align: left;
+    }
+    QPushButton#toolButton:hover {
+        background-color: #3498DB;
+    }
+    QPushButton#toolButton:pressed {
+        background-color: #2980B9;
+    }
+"""
+
+TOOLS_PANEL_STYLE = """
+    QFrame {
+        background-color: #2C3E50;
+        border-radius: 15px;
+        padding: 10px;
+        min-width: 250px;
+        max-width: 400px;
+    }
+    QPushButton#toolButton {
+        background-color: #34495E;
+        color: white;
+        border: none;
+        border-radius: 10px;
+        padding: 20px;
+        font-size: 16px;
+        font-weight: bold;
+        text-align: left;
+    }
+    QPushButton#toolButton:hover {
+        background-color: #3498DB;
+    }
+    QPushButton#toolButton:pressed {
+        background-color: #2980B9;
+    }
+"""
+
+if njit is not None:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _extract_centerline(binary):
+        """Returns the columns holding signal pixels and the mean signal row in each."""
+        height, width = binary.shape
+        counts = np.zeros(width, dtype=np.int32)
+        sums = np.zeros(width, dtype=np.float64)
+        for x in prange(width):
+            count = 0
+            total = 0.0
+            for y in range(height):
+                if binary[y, x]:
+                    count += 1
+                    total += y
+            counts[x] = count
+            sums[x] = total
+        signal_x = np.flatnonzero(counts)
+        return signal_x, sums[signal_x] / counts[signal_x]
+
+    @njit(cache=True, parallel=True)
+    def _scan_word_columns(binary, words):
+        height, width = binary.shape
+        n_words = words.shape[1]
+        first = np.full(width, -1, dtype=np.int32)
+        last = np.full(width, -1, dtype=np.int32)
+        # Eight columns per uint64 word: background words are skipped with one
+        # compare, and only the bytes of a nonzero word are looked at
+        for k in prange(n_words):
+            base = 8 * k
+            pending = 0xFF
+            for y in range(height):
+                if words[y, k] == 0:
+                    continue
+                for j in range(8):
+                    if pending >> j & 1 and binary[y, base + j] == 255:
+                        first[base + j] = y
+                        pending &= ~(1 << j)
+                if pending == 0:
+                    break
+            # Only columns that have a first white row have a last one
+            pending = ~pending & 0xFF
+            for y in range(height - 1, -1, -1):
+                if pending == 0:
+                    break
+                if words[y, k] == 0:
+                    continue
+                for j in range(8):
+                    if pending >> j & 1 and binary[y, base + j] == 255:
+                        last[base + j] = y
+                        pending &= ~(1 << j)
+        # Columns past the last whole word, byte by byte
+        for x in range(8 * n_words, width):
+            for y in range(height):
+                if binary[y, x] == 255:
+                    first[x] = y
+                    break
+            if first[x] >= 0:
+                for y in range(height - 1, -1, -1):
+                    if binary[y, x] == 255:
+                        last[x] = y
+                        break
+        return first, last
+
+    def _scan_columns(binary):
+        """Returns the first and last white row of every column, -1 where there is none."""
+        binary = np.ascontiguousarray(binary, dtype=np.uint8)
+        # The whole words are copied out to a C-contiguous array first: a column
+        # slice of binary is not contiguous unless its width is a multiple of 8,
+        # and a uint64 view needs every row to be
+        words = np.ascontiguousarray(binary[:, :binary.shape[1] // 8 * 8]).view(np.uint64)
+        return _scan_word_columns(binary, words)
+
+class RectStore:
+    """
+    Column-wise snapshot of the drawn rectangles: one (N, 4) array of
+    x1, y1, x2, y2 coordinates and a parallel list of names.
+    """
+    def __init__(self, coords, names):
+        self.coords = coords
+        self.names = names
+        # The first rectangle wins on duplicate names, as with a linear scan
+        self.name_to_idx = {}
+        for idx, name in enumerate(names):
+            self.name_to_idx.setdefault(name, idx)
+
+    @classmethod
+    def from_rectangles(cls, rectangles):
+        coords = np.array([rect[:4] for rect in rectangles], dtype=np.float64).reshape(-1, 4)
+        return cls(coords, [rect[4] for rect in rectangles])
+
+    def __len__(self):
+        return len(self.names)
+
+    def pixel_boxes(self, width, height):
+        """Returns the rectangles as int32 pixel boxes clipped to a width x height image."""
+        return np.clip(self.coords, 0, [width, height, width, height]).astype(np.int32)
 
 class QuickActionButton(QPushButton):
     def __init__(self, text, color="#4A90E2"):
         super().__init__(text)
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 15px;
-                padding: 8px 20px;
-                font-size: 13px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {color}DD;
-            }}
-        """)
+        self.setStyleSheet(QUICK_ACTION_BUTTON_STYLE % (color, color))
         self.setCursor(Qt.PointingHandCursor)
 
 class ChatbotWidget(QWidget):
@@ -70,8 +370,23 @@ class ChatbotWidget(QWidget):
     Main chat interface widget that handles all chat-related functionality.
     Includes message display, input handling, and chat history management.
     """
+    # Message text, filled in with % formatting. Qt's rich text renders only
+    # the colors and size of these bubbles; their alignment and spacing come
+    # from the block formats built in __init__
+    _USER_HTML = '<span style="background: #3498DB; color: white; font-size: 14px;">%s</span>'
+    _AI_HTML = '<span style="background: #F5F5F5; color: #2C3E50; font-size: 14px;">%s</span>'
+    
     def __init__(self):
         super().__init__()
+        # Block formats of the user's messages and of the AI's responses
+        self._user_block_fmt = QTextBlockFormat()
+        self._user_block_fmt.setAlignment(Qt.AlignRight)
+        self._user_block_fmt.setTopMargin(10)
+        self._user_block_fmt.setBottomMargin(10)
+        self._ai_block_fmt = QTextBlockFormat()
+        self._ai_block_fmt.setAlignment(Qt.AlignLeft)
+        self._ai_block_fmt.setTopMargin(10)
+        self._ai_block_fmt.setBottomMargin(10)
         self.init_ui()
 
     def init_ui(self):
@@ -82,15 +397,7 @@ class ChatbotWidget(QWidget):
         
         # Header section with gradient background
         header = QFrame()
-        header.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
-                                          stop:0 #2C3E50, stop:1 #3498DB);
-                border-top-left-radius: 15px;
-                border-top-right-radius: 15px;
-                border-bottom: 2px solid rgba(255, 255, 255, 0.1);
-            }
-        """)
+        header.setStyleSheet(CHAT_HEADER_STYLE)
         header.setMinimumHeight(80)
         header_layout = QHBoxLayout(header)
         header_layout.setContentsMargins(20, 15, 20, 15)
@@ -98,13 +405,7 @@ class ChatbotWidget(QWidget):
         # Doctor icon with container
         icon_container = QFrame()
         icon_container.setFixedSize(50, 50)
-        icon_container.setStyleSheet("""
-            QFrame {
-                background: rgba(255, 255, 255, 0.1);
-                border-radius: 25px;
-                padding: 8px;
-            }
-        """)
+        icon_container.setStyleSheet(CHAT_ICON_CONTAINER_STYLE)
         icon_layout = QVBoxLayout(icon_container)
         icon_layout.setContentsMargins(0, 0, 0, 0)
         
@@ -122,18 +423,11 @@ class ChatbotWidget(QWidget):
         title_layout.setSpacing(2)
         
         title = QLabel("Medical AI Assistant")
-        title.setStyleSheet("""
-            color: white;
-            font-size: 18px;
-            font-weight: bold;
-        """)
+        title.setStyleSheet(CHAT_TITLE_STYLE)
         title_layout.addWidget(title)
         
         status = QLabel("● Active")
-        status.setStyleSheet("""
-            color: #2ECC71;
-            font-size: 13px;
-        """)
+        status.setStyleSheet(CHAT_STATUS_STYLE)
         title_layout.addWidget(status)
         
         header_layout.addWidget(title_container, stretch=1)
@@ -141,135 +435,76 @@ class ChatbotWidget(QWidget):
         # Settings button
         settings_btn = QPushButton("⚙️")
         settings_btn.setFont(QFont("Segoe UI Emoji", 16))
-        settings_btn.setStyleSheet("""
-            QPushButton {
-                color: white;
-                background: transparent;
-                border: none;
-                padding: 5px;
-                border-radius: 15px;
-            }
-            QPushButton:hover {
-                background: rgba(255, 255, 255, 0.1);
-            }
-        """)
+        settings_btn.setStyleSheet(CHAT_SETTINGS_BUTTON_STYLE)
         header_layout.addWidget(settings_btn)
         
         layout.addWidget(header)
         
         # Chat display area
         chat_container = QFrame()
-        chat_container.setStyleSheet("""
-            QFrame {
-                background: white;
-                border: none;
-            }
-        """)
+        chat_container.setStyleSheet(CHAT_CONTAINER_STYLE)
         chat_layout = QVBoxLayout(chat_container)
         chat_layout.setContentsMargins(0, 0, 0, 0)
         
+        # A QTextEdit, as the bubbles need block alignment and margins that
+        # QPlainTextEdit does not render. The document is capped so its layout
+        # stays bounded, and keeps no undo history
         self.chat_display = QTextEdit()
         self.chat_display.setReadOnly(True)
+        self.chat_display.setUndoRedoEnabled(False)
+        self.chat_display.document().setMaximumBlockCount(MAX_CHAT_BLOCKS)
         self.chat_display.setPlaceholderText("Start your medical consultation here...")
-        self.chat_display.setStyleSheet("""
-            QTextEdit {
-                background-color: white;
-                border: none;
-                padding: 20px;
-                font-size: 14px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #F0F0F0;
-                width: 10px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: #BDBDBD;
-                border-radius: 5px;
-                min-height: 20px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-        """)
+        self.chat_display.setStyleSheet(CHAT_DISPLAY_STYLE)
         chat_layout.addWidget(self.chat_display)
         
         layout.addWidget(chat_container)
         
         # Input area
         input_frame = QFrame()
-        input_frame.setStyleSheet("""
-            QFrame {
-                background: white;
-                border-bottom-left-radius: 15px;
-                border-bottom-right-radius: 15px;
-                padding: 15px;
-                border-top: 1px solid #E0E0E0;
-            }
-        """)
+        input_frame.setStyleSheet(CHAT_INPUT_FRAME_STYLE)
         input_layout = QHBoxLayout(input_frame)
         input_layout.setContentsMargins(15, 10, 15, 10)
         
         self.input_field = QLineEdit()
         self.input_field.setPlaceholderText("Type your message here...")
-        self.input_field.setStyleSheet("""
-            QLineEdit {
-                border: 2px solid #E0E0E0;
-                border-radius: 20px;
-                padding: 10px 15px;
-                font-size: 14px;
-                background: white;
-            }
-            QLineEdit:focus {
-                border-color: #3498DB;
-            }
-        """)
+        self.input_field.setStyleSheet(CHAT_INPUT_FIELD_STYLE)
         self.input_field.returnPressed.connect(self.send_message)
         input_layout.addWidget(self.input_field)
         
         send_btn = QPushButton("➤")
         send_btn.setFont(QFont("Segoe UI Symbol", 14))
         send_btn.setFixedSize(40, 40)
-        send_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #3498DB;
-                color: white;
-                border-radius: 20px;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #2980B9;
-            }
-            QPushButton:pressed {
-                background-color: #2475A8;
-            }
-        """)
+        send_btn.setStyleSheet(CHAT_SEND_BUTTON_STYLE)
         send_btn.clicked.connect(self.send_message)
         input_layout.addWidget(send_btn)
         
         layout.addWidget(input_frame)
 
-    def _display_user_message(self, message):
-        """Displays the user's message in the chat."""
-        self.chat_display.append(
-            f'<div style="margin: 10px 0px; text-align: right;">'
-            f'<span style="background: #3498DB; color: white; padding: 12px 18px; '
-            f'border-radius: 18px 18px 0px 18px; display: inline-block; '
-            f'max-width: 70%; text-align: left; font-size: 14px;">'
-            f'{message}</span></div>'
-        )
-
-    def _display_ai_response(self):
-        """Displays the AI's response in the chat."""
+    def _user_message_html(self, message):
+        """Returns the HTML bubble for the user's message, escaped so it renders as typed."""
+        return self._USER_HTML % html.escape(message, quote=False).replace("\n", "<br>")
+
+    def _ai_response_html(self):
+        """Returns the HTML bubble for the AI's response."""
         response = "I am here to help with your medical questions. How can I assist you today?"
-        self.chat_display.append(
-            f'<div style="margin: 10px 0px;">'
-            f'<span style="background: #F5F5F5; color: #2C3E50; padding: 12px 18px; '
-            f'border-radius: 18px 18px 18px 0px; display: inline-block; '
-            f'max-width: 70%; font-size: 14px;">'
-            f'{response}</span></div>'
-        )
+        return self._AI_HTML % response
+
+    def _append_messages(self, *messages):
+        """
+        Appends (block format, HTML fragment) messages to the chat, each in a
+        block of its own, as one edit so the layout runs once.
+        """
+        document = self.chat_display.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for block_fmt, fragment in messages:
+            if not document.isEmpty():
+                cursor.insertBlock(block_fmt, QTextCharFormat())
+            cursor.insertHtml(fragment)
+            # insertHtml may carry over the fragment's own block format
+            cursor.setBlockFormat(block_fmt)
+        cursor.endEditBlock()
 
     def _scroll_to_bottom(self):
         """Scrolls the chat display to show the latest message."""
@@ -280,45 +515,16 @@ class ChatbotWidget(QWidget):
         """Handles sending and displaying messages in the chat."""
         message = self.input_field.text().strip()
         if message:
-            self._display_user_message(message)
+            self._append_messages((self._user_block_fmt, self._user_message_html(message)),
+                                  (self._ai_block_fmt, self._ai_response_html()))
             self.input_field.clear()
-            self._display_ai_response()
             self._scroll_to_bottom()
 
 class InputDialog(QDialog):
     def __init__(self, parent=None, title="", label=""):
         super().__init__(parent)
         self.setWindowTitle(title)
-        self.setStyleSheet("""
-            QDialog {
-                background-color: white;
-                border-radius: 10px;
-            }
-            QLabel {
-                font-size: 14px;
-                color: #2C3E50;
-            }
-            QLineEdit {
-                padding: 8px;
-                border: 2px solid #BDC3C7;
-                border-radius: 5px;
-                font-size: 14px;
-            }
-            QLineEdit:focus {
-                border-color: #3498DB;
-            }
-            QPushButton {
-                padding: 8px 16px;
-                background-color: #3498DB;
-                color: white;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #2980B9;
-            }
-        """)
+        self.setStyleSheet(INPUT_DIALOG_STYLE)
         
         layout = QVBoxLayout(self)
         layout.setSpacing(15)
@@ -342,14 +548,7 @@ class InputDialog(QDialog):
         
         self.cancel_button = QPushButton("Cancel")
         self.cancel_button.clicked.connect(self.reject)
-        self.cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #E74C3C;
-            }
-            QPushButton:hover {
-                background-color: #C0392B;
-            }
-        """)
+        self.cancel_button.setStyleSheet(INPUT_DIALOG_CANCEL_STYLE)
         button_layout.addWidget(self.cancel_button)
         
         layout.addLayout(button_layout)
@@ -375,7 +574,15 @@ class ObservationDialog(QDialog):
         self.selected_class = "Select Class"
         self.selected_file_path = "No file uploaded"
 
-        self.remaining_options = [name for _, _, _, _, name in rectangles]
+        self.remaining_options = [rect[4] for rect in rectangles]
+        # Rectangles are drawn over the displayed image, which is already the
+        # resized `img`, so their scene coordinates are pixel coordinates of it.
+        # Convert all of them to clipped integer boxes once.
+        self.rect_store = RectStore.from_rectangles(rectangles)
+        height, width = img.shape[:2]
+        self.boxes = self.rect_store.pixel_boxes(width, height)
+        # Preview pixmaps per rectangle name, with the QImage and pixel buffer they wrap
+        self._pixmap_cache = {}
 
         self.init_data()
         self.init_widgets()
@@ -460,23 +667,33 @@ class ObservationDialog(QDialog):
     def on_selection_changed(self, value):
         selected_name = self.dropdown_list_selection.currentText()
         self.selected_name = selected_name
-        for rect in self.rectangles:
-            x1, y1, x2, y2, name = rect
-            if name == selected_name:
-                x1_resized = int(x1 * img_resized_size[0] / img_original_size[1])
-                y1_resized = int(y1 * img_resized_size[1] / img_original_size[0])
-                x2_resized = int(x2 * img_resized_size[0] / img_original_size[1])
-                y2_resized = int(y2 * img_resized_size[1] / img_original_size[0])
-
-                sub_image = img[y1_resized:y2_resized, x1_resized:x2_resized]
-                sub_image = cv2.resize(sub_image, (200, 100))
-                sub_image = cv2.cvtColor(sub_image, cv2.COLOR_BGR2RGB)
-                h, w, ch = sub_image.shape
-                bytes_per_line = ch * w
-                q_img = QImage(sub_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_img)
-                self.image_widget.setPixmap(pixmap)
-                break
+        cached = self._pixmap_cache.get(selected_name)
+        if cached is not None:
+            self.image_widget.setPixmap(cached[1])
+            return
+
+        idx = self.rect_store.name_to_idx.get(selected_name)
+        if idx is None:
+            return
+
+        x1, y1, x2, y2 = self.boxes[idx]
+        sub_image = self.img[y1:y2, x1:x2]
+        if sub_image.size == 0:
+            return
+        # INTER_AREA is both faster and sharper than the default for shrinking
+        h, w = sub_image.shape[:2]
+        interpolation = cv2.INTER_AREA if w >= 200 and h >= 100 else cv2.INTER_LINEAR
+        sub_image = cv2.resize(sub_image, (200, 100), interpolation=interpolation)
+        # BGRA bytes are Format_RGB32's memory layout, so the pixmap is made
+        # without a format conversion
+        sub_image = np.ascontiguousarray(cv2.cvtColor(sub_image, cv2.COLOR_BGR2BGRA))
+        h, w, ch = sub_image.shape
+        bytes_per_line = ch * w
+        q_img = QImage(sub_image.data, w, h, bytes_per_line, QImage.Format_RGB32)
+        pixmap = QPixmap.fromImage(q_img, Qt.NoFormatConversion)
+        # QImage does not copy sub_image's buffer, so keep both alive with the pixmap
+        self._pixmap_cache[selected_name] = (q_img, pixmap, sub_image)
+        self.image_widget.setPixmap(pixmap)
 
     def on_selection_class_validate(self):
         self.on_validate_button_enabled()
@@ -537,65 +754,87 @@ class ObservationDialog(QDialog):
         classes_dir = os.path.join(save_path, "classes")
         os.makedirs(classes_dir, exist_ok=True)
 
+        selections = []
         for selected_name in self.valid_selections:
             observation_data = self.observations_dict.get(selected_name)
-            if observation_data:
-                observation_text = observation_data["observation"]
-                selected_class = observation_data["class"]
-
-                for rect in self.rectangles:
-                    x1, y1, x2, y2, name = rect
-                    if name == selected_name:
-                        x1_resized = int(x1 * img_resized_size[0] / img_original_size[1])
-                        y1_resized = int(y1 * img_resized_size[1] / img_original_size[0])
-                        x2_resized = int(x2 * img_resized_size[0] / img_original_size[1])
-                        y2_resized = int(y2 * img_resized_size[1] / img_original_size[0])
-
-                        sub_image = img[y1_resized:y2_resized, x1_resized:x2_resized]
-                        base_filename = os.path.join(save_path, f"{selected_name}.png")
-                        rectangle_image_filename = base_filename
-
-                        count = 1
-                        unique_name = selected_name
-                        while os.path.exists(rectangle_image_filename):
-                            unique_name = f"{selected_name}_copy{count}"
-                            rectangle_image_filename = os.path.join(save_path, f"{unique_name}.png")
-                            count += 1
-
-                        cv2.imwrite(rectangle_image_filename, sub_image)
-
-                        if observation_text:
-                            observation_filename = os.path.join(save_path, f"{unique_name}_observation.txt")
-                            with open(observation_filename, "w") as obs_file:
-                                obs_file.write(observation_text)
-
-                        class_filename = os.path.join(classes_dir, f"{selected_class}.txt")
-                        with open(class_filename, "a") as class_file:
-                            class_file.write(f"{unique_name}, ")
-
-                        break
+            idx = self.rect_store.name_to_idx.get(selected_name)
+            if observation_data and idx is not None:
+                selections.append((selected_name, idx, observation_data["observation"],
+                                   observation_data["class"]))
+
+        # All crops are views into the same image, taken in one pass over the
+        # pixel boxes of the selected rectangles
+        indices = np.array([idx for _, idx, _, _ in selections], dtype=np.intp)
+        crops = [self.img[y1:y2, x1:x2] for x1, y1, x2, y2 in self.boxes[indices].tolist()]
+
+        # Names are reserved serially so the dedup stays deterministic; the
+        # encoding and writing is then done on a thread pool
+        existing = {entry.name for entry in os.scandir(save_path)}
+        tasks = []
+        for (selected_name, _, observation_text, selected_class), sub_image in zip(selections, crops):
+            count = 1
+            unique_name = selected_name
+            while f"{unique_name}.png" in existing:
+                unique_name = f"{selected_name}_copy{count}"
+                count += 1
+            existing.add(f"{unique_name}.png")
+
+            rectangle_image_filename = os.path.join(save_path, f"{unique_name}.png")
+            class_filename = os.path.join(classes_dir, f"{selected_class}.txt")
+            tasks.append((rectangle_image_filename, sub_image, observation_text,
+                          class_filename, unique_name))
+
+        def write_one(task):
+            rectangle_image_filename, sub_image, observation_text, _, unique_name = task
+            cv2.imwrite(rectangle_image_filename, sub_image)
+            if observation_text:
+                observation_filename = os.path.join(save_path, f"{unique_name}_observation.txt")
+                with open(observation_filename, "w", newline="", encoding="utf-8") as obs_file:
+                    obs_file.write(observation_text)
+
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(write_one, tasks))
+
+        # Class files are shared between rectangles, so collect their rows in
+        # order here and append to each file once
+        class_rows = defaultdict(list)
+        for _, _, _, class_filename, unique_name in tasks:
+            class_rows[class_filename].append(unique_name)
+        for class_filename, names in class_rows.items():
+            with open(class_filename, "a", newline="", encoding="utf-8") as class_file:
+                class_file.write(", ".join(names) + ", ")
 
         self.accept()
 
 class DigitalizeDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, img, rectangles, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Digitalize Lead")
         self.setMinimumSize(800, 600)
         
         self.processed_images = {}
         self.processed_signals = {}
+        self._last_rgb = None
+        self.img = img
         
         layout = QVBoxLayout(self)
         
         # Add list of rectangles
+        self.rect_store = RectStore.from_rectangles(rectangles)
         self.rect_list = QComboBox()
-        self.rect_list.addItems([rect[4] for rect in rectangles])
+        self.rect_list.addItems(self.rect_store.names)
         layout.addWidget(self.rect_list)
         
         # Add preview area
         self.preview_widget = QLabel()
         layout.addWidget(self.preview_widget)
+
+        # Digitalized signals are drawn into this embedded canvas, which is
+        # reused across clicks instead of opening a pyplot window each time
+        self._fig = Figure(figsize=(8, 4))
+        self._canvas = FigureCanvas(self._fig)
+        self._ax = self._fig.add_subplot(111)
+        layout.addWidget(self._canvas)
         
         # Add buttons
         btn_layout = QHBoxLayout()
@@ -619,24 +858,26 @@ class DigitalizeDialog(QDialog):
         if not name:
             return
             
-        for rect in rectangles:
-            if rect[4] == name:
-                x1, y1, x2, y2, _ = rect
-                x1_resized = int(x1 * img_resized_size[0] / img_original_size[1])
-                y1_resized = int(y1 * img_resized_size[1] / img_original_size[0])
-                x2_resized = int(x2 * img_resized_size[0] / img_original_size[1])
-                y2_resized = int(y2 * img_resized_size[1] / img_original_size[0])
-                
-                sub_image = img[y1_resized:y2_resized, x1_resized:x2_resized]
-                self.processed_images[name] = sub_image
-                
-                # Display preview
-                preview_img = cv2.cvtColor(sub_image, cv2.COLOR_BGR2RGB)
-                h, w, ch = preview_img.shape
-                bytes_per_line = ch * w
-                q_img = QImage(preview_img.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                self.preview_widget.setPixmap(QPixmap.fromImage(q_img))
-                break
+        idx = self.rect_store.name_to_idx.get(name)
+        if idx is None:
+            return
+
+        height, width = self.img.shape[:2]
+        x1, y1, x2, y2 = self.rect_store.pixel_boxes(width, height)[idx]
+        sub_image = self.img[y1:y2, x1:x2]
+        if sub_image.size == 0:
+            return
+        self.processed_images[name] = sub_image
+
+        # Display preview; QImage wraps the buffer without copying, so it
+        # must be C-contiguous and outlive this method. BGRA bytes are
+        # Format_RGB32's memory layout, so no format conversion is needed.
+        preview_img = np.ascontiguousarray(cv2.cvtColor(sub_image, cv2.COLOR_BGR2BGRA))
+        self._last_rgb = preview_img
+        h, w, ch = preview_img.shape
+        bytes_per_line = ch * w
+        q_img = QImage(preview_img.data, w, h, bytes_per_line, QImage.Format_RGB32)
+        self.preview_widget.setPixmap(QPixmap.fromImage(q_img, Qt.NoFormatConversion))
 
     def digitalize_selected(self):
         name = self.rect_list.currentText()
@@ -645,36 +886,36 @@ class DigitalizeDialog(QDialog):
             
         img = self.processed_images[name]
         
-        # Process image
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, np.array([0, 0, 0]), np.array([180, 255, 220]))
-        result = cv2.bitwise_and(img, img, mask=mask)
-        result[mask == 0] = 255
-        
-        # Convert to grayscale and threshold
-        gray = cv2.cvtColor(result, cv2.COLOR_BGR2GRAY)
+        # Signal pixels are dark (gray <= 127) and not too bright in HSV value
+        # (V = max(B, G, R) <= 220); both tests are done on the image directly
+        # rather than through an HSV copy and a whitened composite
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         _, binary = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
-        
-        # Extract signal
-        height, width = binary.shape
-        signal_x = []
-        signal_y = []
-        
-        for x in range(width):
-            col = binary[:, x]
-            points = np.where(col == 255)[0]
-            if len(points) > 0:
-                y = np.mean(points)
-                signal_x.append(x)
-                signal_y.append(y)
+        value_mask = cv2.inRange(img.max(axis=2), 0, 220)
+        cv2.bitwise_and(binary, value_mask, dst=binary)
+        
+        # Extract signal: the mean row of the signal pixels in every column is the
+        # first moment of the binary image, done in one compiled pass with numba
+        # or as two SIMD column reductions otherwise
+        if njit is not None:
+            signal_x, signal_y = _extract_centerline(binary)
+        else:
+            height, width = binary.shape
+            _, unit = cv2.threshold(binary, 0, 1, cv2.THRESH_BINARY)
+            rows = np.arange(height, dtype=np.float32).reshape(height, 1)
+            counts = cv2.reduce(unit, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+            sums = cv2.reduce(unit * rows, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32F).ravel()
+            valid = counts > 0
+            signal_x = np.flatnonzero(valid)
+            signal_y = sums[valid] / counts[valid]
         
         self.processed_signals[name] = (signal_x, signal_y)
         
         # Show preview of digitalized signal
-        plt.figure(figsize=(8, 4))
-        plt.plot(signal_x, signal_y)
-        plt.title(f"Digitalized Signal - {name}")
-        plt.show()
+        self._ax.clear()
+        self._ax.plot(signal_x, signal_y)
+        self._ax.set_title(f"Digitalized Signal - {name}")
+        self._canvas.draw_idle()
 
     def save_all(self):
         if not self.processed_signals:
@@ -687,30 +928,99 @@ class DigitalizeDialog(QDialog):
             
         for name, (x, y) in self.processed_signals.items():
             filename = os.path.join(save_dir, f"{name}_signal.csv")
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['x', 'y'])
-                for xi, yi in zip(x, y):
-                    writer.writerow([xi, yi])
+            rows = np.column_stack([np.asarray(x, dtype=np.int32), np.asarray(y, dtype=np.float32)])
+            np.savetxt(filename, rows, fmt=['%d', '%.4f'], delimiter=',', header='x,y', comments='')
                     
         QMessageBox.information(self, "Success", "All signals saved successfully!")
         self.accept()
 
+class ImageLoadSignals(QObject):
+    """Signals of ImageLoadTask; a QRunnable cannot emit signals itself."""
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str)
+
+class ImageLoadTask(QRunnable):
+    """
+    Reads an image and resizes it to target_width, keeping the aspect ratio,
+    on a worker thread so a large scan does not freeze the window.
+    """
+    def __init__(self, path, target_width):
+        super().__init__()
+        self.path = path
+        self.target_width = target_width
+        self.signals = ImageLoadSignals()
+
+    def run(self):
+        image = cv2.imread(self.path, cv2.IMREAD_COLOR)
+        if image is None:
+            self.signals.failed.emit(self.path)
+            return
+        
+        # Resize image while maintaining aspect ratio, in integer math; scans
+        # are usually shrunk, where INTER_AREA is both faster and sharper
+        height, width = image.shape[:2]
+        new_width = self.target_width
+        new_height = height * new_width // width
+        interpolation = cv2.INTER_AREA if new_width < width else cv2.INTER_LINEAR
+        image = cv2.resize(image, (new_width, new_height), interpolation=interpolation)
+        self.signals.loaded.emit(self.path, image)
+
 class ECGAnalysisPage(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.main_window = parent
+        
+        # Workspace state: the displayed (resized) image and the rectangles
+        # drawn over it, with their undo history
+        self._img = None
+        self._image_loaded = False
+        self._opened_image_path = None
+        # Newest image requested from the thread pool; it becomes the opened
+        # image only once it has loaded
+        self._pending_image_path = None
+        self._rectangles = []
+        self._selected_rectangle = None
+        self._rectangle_history = deque(maxlen=MAX_HISTORY)
+        self._history_index = -1
+        
         self.init_ui()
         
+        # (N, 4) coordinates of the rectangles, for the click hit-test
+        self._rect_array = RectStore.from_rectangles(self._rectangles).coords
+        
+        # Image being loaded by open_image
+        self._load_task = None
+        
+        # Resized image as opened, and its pixmap, restored by reset_workspace
+        self._pristine_img = None
+        self._pristine_pixmap = None
+        
+        # RGB conversion buffer reused by _make_pixmap, and the buffer its
+        # last QImage points into
+        self._rgb_buf = None
+        self._qimage_buf = None
+        
+        # Scene items reused by update_display
+        self._pixmap_item = None
+        self._pixmap_source = None
+        self._highlight_item = None
+        self._rect_items = []
+        self._text_items = []
+        
+        # Pens, brush and text color of the rectangle items, built once
+        self._pen_normal = QPen(QColor("#3498DB"), 2)
+        self._pen_selected = QPen(QColor("#E74C3C"), 2)
+        self._brush_selected = QBrush(QColor(231, 76, 60, 50))
+        self._text_color = QColor("#2C3E50")
+        
         # Initialize drawing variables
         self.start_pos = None
         self.current_rect = None
         self.drawing = False
         
         # Initialize history
-        global rectangle_history, current_history_index
-        rectangle_history = [[] if not rectangles else rectangles.copy()]
-        current_history_index = 0
+        self._rectangle_history.append(tuple(self._rectangles))
+        self._history_index = 0
         
     def init_ui(self):
         # Main layout with better responsiveness
@@ -720,14 +1030,7 @@ class ECGAnalysisPage(QWidget):
         
         # Left panel for buttons with fixed width
         left_panel = QFrame()
-        left_panel.setStyleSheet("""
-            QFrame {
-                background-color: #2C3E50;
-                border: none;
-                min-width: 200px;
-                max-width: 300px;
-            }
-        """)
+        left_panel.setStyleSheet(ECG_LEFT_PANEL_STYLE)
         left_panel.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
         left_layout = QVBoxLayout(left_panel)
         left_layout.setSpacing(10)
@@ -750,9 +1053,18 @@ class ECGAnalysisPage(QWidget):
         
         # Create graphics view with improved responsiveness
         self.scene = QGraphicsScene()
+        # One pixmap and a handful of rectangles: a linear scan beats keeping
+        # a BSP index up to date on every add, remove and setRect
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
         self.graphics_view = QGraphicsView(self.scene)
         self.graphics_view.setRenderHints(QPainter.RenderHint.Antialiasing | 
                                         QPainter.RenderHint.SmoothPixmapTransform)
+        # Draw through an OpenGL viewport so the pixmap is kept as a texture and
+        # zooming or panning is blitted on the GPU; GL viewports repaint whole
+        self.graphics_view.setViewport(QOpenGLWidget())
+        self.graphics_view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.graphics_view.setOptimizationFlags(QGraphicsView.DontAdjustForAntialiasing |
+                                                QGraphicsView.DontSavePainterState)
         self.graphics_view.setStyleSheet("""
             QGraphicsView {
                 background-color: white;
@@ -827,25 +1139,10 @@ class ECGAnalysisPage(QWidget):
             ("📊 Digitalize Lead", self.digitalize_lead)
         ]
         
+        # Styled by the toolButton rule of the panel's stylesheet, parsed once
         for text, handler in buttons:
             btn = QPushButton(text)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #34495E;
-                    color: white;
-                    border: none;
-                    border-radius: 8px;
-                    padding: 12px;
-                    font-size: 14px;
-                    text-align: left;
-                }
-                QPushButton:hover {
-                    background-color: #3498DB;
-                }
-                QPushButton:pressed {
-                    background-color: #2980B9;
-                }
-            """)
+            btn.setObjectName("toolButton")
             btn.setCursor(Qt.PointingHandCursor)
             btn.clicked.connect(handler)
             layout.addWidget(btn)
@@ -857,34 +1154,92 @@ class ECGAnalysisPage(QWidget):
         if isinstance(self.main_window, QMainWindow):
             self.main_window.stacked_widget.setCurrentIndex(0)
     
+    def _clear_scene(self):
+        """Clears the scene and forgets the items update_display reuses."""
+        self.scene.clear()
+        self._pixmap_item = None
+        self._pixmap_source = None
+        self._highlight_item = None
+        self._rect_items = []
+        self._text_items = []
+
+    def _make_pixmap(self, image, code=None):
+        """
+        Wraps a BGR image as a QPixmap. If code is given, the image is first
+        converted with it to RGB through a persistent buffer.
+        """
+        height, width = image.shape[:2]
+        if code is None:
+            # Qt reads BGR byte order directly, so no conversion copy is needed
+            buffer = np.ascontiguousarray(image)
+            image_format = QImage.Format_BGR888
+        else:
+            if self._rgb_buf is None or self._rgb_buf.shape != image.shape:
+                self._rgb_buf = np.empty_like(image)
+            cv2.cvtColor(image, code, dst=self._rgb_buf)
+            buffer = self._rgb_buf
+            image_format = QImage.Format_RGB888
+        # The QImage points into the buffer, which the page keeps alive
+        self._qimage_buf = buffer
+        q_img = QImage(buffer.data, width, height, buffer.strides[0], image_format)
+        return QPixmap.fromImage(q_img)
+
+    def _set_scene_pixmap(self, pixmap, source=None):
+        """Shows pixmap as the scene background, reusing the pixmap item."""
+        if self._pixmap_item is None:
+            self._pixmap_item = self.scene.addPixmap(pixmap)
+            self._pixmap_item.setZValue(-1)
+        else:
+            self._pixmap_item.setPixmap(pixmap)
+        self._pixmap_source = source
+
     def update_display(self):
-        if img is not None:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            height, width = img_rgb.shape[:2]
-            bytes_per_line = 3 * width
-            q_img = QImage(img_rgb.data, width, height, bytes_per_line, 
-                         QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
-            self.scene.clear()
-            self.scene.addPixmap(pixmap)
+        # Every change to the rectangles is followed by a redraw, so the array
+        # the click hit-test runs against is refreshed here
+        self._rect_array = RectStore.from_rectangles(self._rectangles).coords
+        if self._img is not None:
+            # The pixmap is only rebuilt when the image itself has changed
+            if self._pixmap_item is None or self._pixmap_source is not self._img:
+                self._set_scene_pixmap(self._make_pixmap(self._img), self._img)
             
-            # Draw rectangles with improved style
-            for rect in rectangles:
+            # Draw rectangles with improved style, reusing the items of the
+            # previous call and only adding or removing the difference
+            for i, rect in enumerate(self._rectangles):
                 x1, y1, x2, y2, name = rect
-                pen = QPen(QColor("#3498DB"), 2)
-                if rect == selected_rectangle:
-                    pen.setColor(QColor("#E74C3C"))
-                    # Add selection highlight
-                    highlight = self.scene.addRect(x1, y1, x2-x1, y2-y1, 
-                                                 QPen(Qt.NoPen),
-                                                 QBrush(QColor(231, 76, 60, 50)))
-                rect_item = self.scene.addRect(x1, y1, x2-x1, y2-y1, pen)
-                
-                # Add text label
-                text = self.scene.addText(name)
-                text.setDefaultTextColor(QColor("#2C3E50"))
+                pen = self._pen_selected if rect == self._selected_rectangle else self._pen_normal
+                if i < len(self._rect_items):
+                    rect_item = self._rect_items[i]
+                    rect_item.setRect(x1, y1, x2-x1, y2-y1)
+                    rect_item.setPen(pen)
+                    text = self._text_items[i]
+                    text.setPlainText(name)
+                else:
+                    rect_item = self.scene.addRect(x1, y1, x2-x1, y2-y1, pen)
+                    self._rect_items.append(rect_item)
+                    
+                    # Add text label
+                    text = self.scene.addText(name)
+                    text.setDefaultTextColor(self._text_color)
+                    self._text_items.append(text)
                 text.setPos(x1, y1 - 20)
             
+            for item in self._rect_items[len(self._rectangles):] + self._text_items[len(self._rectangles):]:
+                self.scene.removeItem(item)
+            del self._rect_items[len(self._rectangles):]
+            del self._text_items[len(self._rectangles):]
+            
+            # Add selection highlight
+            if self._selected_rectangle in self._rectangles:
+                x1, y1, x2, y2, _ = self._selected_rectangle
+                if self._highlight_item is None:
+                    self._highlight_item = self.scene.addRect(0, 0, 0, 0,
+                                                              QPen(Qt.NoPen),
+                                                              self._brush_selected)
+                self._highlight_item.setRect(x1, y1, x2-x1, y2-y1)
+                self._highlight_item.show()
+            elif self._highlight_item is not None:
+                self._highlight_item.hide()
+            
             # Fit view while maintaining aspect ratio
             self.graphics_view.fitInView(
                 self.scene.sceneRect(),
@@ -896,48 +1251,41 @@ class ECGAnalysisPage(QWidget):
             self, "Open ECG Image", "", 
             "Images (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)")
         if file_path:
-            global img, opened_image_path, image_loaded, img_original_size, img_resized_size
-            opened_image_path = file_path
-            img = cv2.imread(file_path, cv2.IMREAD_COLOR)
-            if img is not None:
-                # Store original size
-                img_original_size = (img.shape[1], img.shape[0])  # width, height
-                
-                # Resize image while maintaining aspect ratio
-                height, width = img.shape[:2]
-                aspect_ratio = width / height
-                new_width = 1260
-                new_height = int(new_width / aspect_ratio)
-                img = cv2.resize(img, (new_width, new_height))
-                img_resized_size = (new_width, new_height)
-                
-                # Display image
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                bytes_per_line = 3 * new_width
-                q_img = QImage(img_rgb.data, new_width, new_height, bytes_per_line, 
-                             QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_img)
-                self.scene.clear()
-                self.scene.addPixmap(pixmap)
-                self.graphics_view.setScene(self.scene)
-                self.graphics_view.fitInView(
-                    self.scene.sceneRect(), 
-                    Qt.KeepAspectRatio
-                )
-                image_loaded = True
-            else:
-                QMessageBox.critical(self, "Error", "Failed to load image")
+            self._pending_image_path = file_path
+            # The file is decoded and resized on the thread pool; the page keeps
+            # the task, and so its signals, alive until it reports back
+            self._load_task = ImageLoadTask(file_path, 1260)
+            self._load_task.signals.loaded.connect(self._on_image_loaded)
+            self._load_task.signals.failed.connect(self._on_image_load_failed)
+            QThreadPool.globalInstance().start(self._load_task)
+    
+    def _on_image_loaded(self, path, loaded_img):
+        if path != self._pending_image_path:
+            return  # A newer image was opened meanwhile
+        self._opened_image_path = path
+        self._img = loaded_img
+        self._pristine_img = self._img.copy()
+        
+        # Display image
+        self._clear_scene()
+        self.graphics_view.setScene(self.scene)
+        self.update_display()
+        self._pristine_pixmap = self._pixmap_item.pixmap()
+        self._image_loaded = True
+    
+    def _on_image_load_failed(self, path):
+        if path == self._pending_image_path:
+            QMessageBox.critical(self, "Error", "Failed to load image")
     
     def delete_selected(self):
-        global selected_rectangle, rectangles
-        if selected_rectangle and selected_rectangle in rectangles:
-            rectangles.remove(selected_rectangle)
-            selected_rectangle = None
+        if self._selected_rectangle and self._selected_rectangle in self._rectangles:
+            self._rectangles.remove(self._selected_rectangle)
+            self._selected_rectangle = None
             self.update_display()
     
     def save_all_areas(self):
         """Save all rectangle areas as separate images."""
-        if not rectangles or img is None:
+        if not self._rectangles or self._img is None:
             QMessageBox.warning(self, "Warning", "No rectangles to save!")
             return
             
@@ -947,98 +1295,76 @@ class ECGAnalysisPage(QWidget):
             if not save_dir:
                 return
                 
-            for rect in rectangles:
-                x1, y1, x2, y2, name = rect
-                
-                # Convert coordinates to image space
-                x1_resized = int(x1 * img_resized_size[0] / img_original_size[1])
-                y1_resized = int(y1 * img_resized_size[1] / img_original_size[0])
-                x2_resized = int(x2 * img_resized_size[0] / img_original_size[1])
-                y2_resized = int(y2 * img_resized_size[1] / img_original_size[0])
-                
+            # File names are reserved serially, then the PNGs are encoded and
+            # written on a thread pool since OpenCV releases the GIL while encoding
+            tasks = []
+            reserved = set()
+            # Rectangles are drawn over the displayed, already resized image, so
+            # their coordinates only need rounding and clipping to index it
+            rect_store = RectStore.from_rectangles(self._rectangles)
+            height, width = self._img.shape[:2]
+            boxes = rect_store.pixel_boxes(width, height).tolist()
+            for (x1, y1, x2, y2), name in zip(boxes, rect_store.names):
                 # Extract the rectangle area from the image
-                sub_image = img[y1_resized:y2_resized, x1_resized:x2_resized]
+                sub_image = self._img[y1:y2, x1:x2]
                 
                 # Create filename with rectangle name
                 filename = os.path.join(save_dir, f"{name}.png")
                 
                 # If file exists, add number to filename
                 counter = 1
-                while os.path.exists(filename):
+                while filename in reserved or os.path.exists(filename):
                     filename = os.path.join(save_dir, f"{name}_{counter}.png")
                     counter += 1
-                
-                # Save the image
-                cv2.imwrite(filename, sub_image)
+                reserved.add(filename)
+                tasks.append((filename, sub_image))
+            
+            def save_one(task):
+                filename, sub_image = task
+                # Fast compression; the crops are small and mostly flat
+                _, buffer = cv2.imencode('.png', sub_image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                with open(filename, 'wb') as f:
+                    f.write(buffer.tobytes())
             
-            QMessageBox.information(self, "Success", f"All {len(rectangles)} areas saved successfully!")
+            # Save the images
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                list(executor.map(save_one, tasks))
+            
+            QMessageBox.information(self, "Success", f"All {len(self._rectangles)} areas saved successfully!")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save images: {str(e)}")
     
     def remove_background(self):
-        if not opened_image_path:
+        if not self._opened_image_path:
             return
         try:
-            global img
             # Convert the image to HSV color space
-            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+            hsv = cv2.cvtColor(self._img, cv2.COLOR_BGR2HSV)
 
             # Display HSV image in the application
-            hsv_rgb = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
-            height, width = hsv_rgb.shape[:2]
-            bytes_per_line = 3 * width
-            q_img = QImage(hsv_rgb.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
-            self.scene.clear()
-            self.scene.addPixmap(pixmap)
+            self._clear_scene()
+            self._set_scene_pixmap(self._make_pixmap(hsv, cv2.COLOR_HSV2RGB))
             self.graphics_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
             
             # Show message for HSV view
             QMessageBox.information(self, "Processing", "Showing HSV image. Click OK to continue with background removal.")
 
-            # Define the range for the black color in HSV
-            lower_black = np.array([0, 0, 0])    # Lower bound for black color
-            upper_black = np.array([180, 255, 220])  # Upper bound for black color
-
-            # Create a mask for the black color
-            mask_black = cv2.inRange(hsv, lower_black, upper_black)
-
-            # Create a white background
-            white_background = np.full_like(img, 255)  # 255 is white for all channels
-
-            # Invert the black mask to create a mask for non-black areas
-            mask_inv = cv2.bitwise_not(mask_black)
-
-            # Keep black areas from the image
-            black_on_white = cv2.bitwise_and(img, img, mask=mask_black)
+            # Black areas (V <= 220) become pure black and everything else
+            # white, so the composite is the mask of the complementary range
+            # (V >= 221) expanded to three channels
+            lower_background = np.array([0, 0, 221])
+            upper_background = np.array([180, 255, 255])
+            mask_background = cv2.inRange(hsv, lower_background, upper_background)
+            preprocessed_img = cv2.cvtColor(mask_background, cv2.COLOR_GRAY2BGR)
 
-            # Make black areas more black (0)
-            black_on_white[mask_black == 255] = 0  # Set black areas to 0 (pure black)
-
-            # Apply white where it's not black
-            non_black_on_white = cv2.bitwise_and(white_background, white_background, mask=mask_inv)
-
-            # Combine the black areas with the white background
-            preprocessed_img = cv2.add(black_on_white, non_black_on_white)
-
-            # Display preprocessed image in the application
-            preprocessed_rgb = cv2.cvtColor(preprocessed_img, cv2.COLOR_BGR2RGB)
-            height, width = preprocessed_rgb.shape[:2]
-            bytes_per_line = 3 * width
-            q_img = QImage(preprocessed_rgb.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_img)
-            self.scene.clear()
-            self.scene.addPixmap(pixmap)
-            self.graphics_view.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
-
-            # Update the global image with the preprocessed result
-            img = preprocessed_img
+            # Replace the page image with the preprocessed result
+            self._img = preprocessed_img
             
             # Save processed image
-            new_path = opened_image_path.rsplit('.', 1)[0] + "_nobg.png"
+            new_path = self._opened_image_path.rsplit('.', 1)[0] + "_nobg.png"
             cv2.imwrite(new_path, preprocessed_img)
             
-            # Redraw rectangles
+            # Display preprocessed image and redraw rectangles
             self.update_display()
             
             QMessageBox.information(self, "Success", "Background removed successfully!")
@@ -1047,15 +1373,15 @@ class ECGAnalysisPage(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to remove background: {str(e)}")
     
     def digitalize_lead(self):
-        if not rectangles:
+        if not self._rectangles:
             QMessageBox.warning(self, "Warning", "No rectangles drawn!")
             return
-        dialog = DigitalizeDialog(self)
+        dialog = DigitalizeDialog(self._img, self._rectangles, self)
         dialog.exec_()
 
         # Step 2: Digitalize the signal
         # Convert the preprocessed image to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(self._img, cv2.COLOR_BGR2GRAY)
 
         # Threshold the image to get a binary image (black signal on white background)
         _, binary = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY_INV)
@@ -1068,90 +1394,73 @@ class ECGAnalysisPage(QWidget):
         min_amplitude = -1  # Minimum amplitude of the ECG signal (adjust as needed)
         time_scale = 0.01  # Time per pixel in seconds (adjust according to image resolution)
 
-        # Arrays to store the digitalized x and y values
-        signal_x = []
-        signal_y = []
-
-        # Iterate over each column to find the middle y-coordinate of the signal
-        for x in range(binary.shape[1]):  # Iterate over each column (x-axis)
-            column = binary[:, x]  # Get the column
-            # Find all the white pixels in the column
-            y_indices = np.where(column == 255)[0]
-            if len(y_indices) > 0:  # Check if there are any white pixels
-                # Calculate the middle pixel
-                y = (y_indices[0] + y_indices[-1]) // 2
-                # Map the pixel coordinates to the actual ECG values
-                # Normalize the y-coordinate to match the amplitude range
-                normalized_y = max_amplitude - (max_amplitude - min_amplitude) * (y / height)
-
-                # Map the x-coordinate to time (assuming a fixed time scale for now)
-                time = x * time_scale
+        # Middle of the first and last white pixel in every column, found in one
+        # compiled sweep with numba, or otherwise with two argmax reductions over
+        # the whole image instead of a column loop
+        if njit is not None:
+            first, last = _scan_columns(binary)
+            signal_cols = np.flatnonzero(first >= 0)
+            first = first[signal_cols]
+            last = last[signal_cols]
+        else:
+            mask = binary == 255
+            signal_cols = np.flatnonzero(mask.any(axis=0))
+            first = mask.argmax(axis=0)[signal_cols]
+            last = (height - 1) - mask[::-1].argmax(axis=0)[signal_cols]
+        signal_rows = (first + last) // 2
 
-                signal_x.append(time)
-                signal_y.append(normalized_y)
+        # Map the x-coordinates to time (assuming a fixed time scale for now) and
+        # normalize the y-coordinates to match the amplitude range
+        signal_x = signal_cols * time_scale
+        signal_y = max_amplitude - (max_amplitude - min_amplitude) * (signal_rows / height)
 
         # Save the digitalized signal as a CSV file
-        with open('digitalized_signal.csv', mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Time (s)', 'Amplitude'])  # Column headers
-            for time, amplitude in zip(signal_x, signal_y):
-                writer.writerow([time, amplitude])
+        np.savetxt('digitalized_signal.csv', np.column_stack([signal_x, signal_y]),
+                   fmt=['%.6f', '%.6f'], delimiter=',', header='Time (s),Amplitude', comments='')
 
         print("Digitalized signal saved to 'digitalized_signal.csv'")
 
-        # Plot the original image with the digitalized signal overlaid
-        plt.figure(figsize=(width / 100, height / 100))
-        plt.imshow(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        plt.plot([x / time_scale for x in signal_x],
-                 [(1 - (y - min_amplitude) / (max_amplitude - min_amplitude)) * height for y in signal_y],
-                 color='red', linewidth=1)
-        plt.axis('off')
+        # Plot the original image with the digitalized signal overlaid; the
+        # overlay is drawn in pixel coordinates, i.e. the signal columns and rows
+        overlay = pg.GraphicsLayoutWidget(title="Preprocessed Image with Digitalized Signal")
+        view = overlay.addViewBox(lockAspect=True, invertY=True)
+        view.addItem(pg.ImageItem(cv2.cvtColor(self._img, cv2.COLOR_BGR2RGB), axisOrder='row-major'))
+        view.addItem(pg.PlotDataItem(x=signal_cols, y=signal_rows, pen='r'))
+        overlay.resize(width, height)
+        overlay.show()
         print("Preprocessed Image with Digitalized Signal")
-        plt.show()
 
         # Plot only the digitalized signal
-        plt.figure(figsize=(10, 5))
-        plt.plot(signal_x, signal_y, color='black')
+        plot = pg.plot(signal_x, signal_y, pen='k', title="Digitalized ECG Signal")
+        plot.setBackground('w')
+        plot.setLabel('bottom', 'Time (s)')
+        plot.setLabel('left', 'Amplitude')
+        plot.showGrid(x=True, y=True)
         print("Digitalized ECG Signal")
-        plt.xlabel('Time (s)')
-        plt.ylabel('Amplitude')
-        plt.grid(True)
-        plt.show()
+
+        # Keep both windows alive after this method returns
+        self._signal_windows = (overlay, plot)
 
     def reset_workspace(self):
         """Reset the workspace to its original state."""
-        if not opened_image_path:
+        if not self._opened_image_path:
             return
             
         try:
-            global img, rectangles, selected_rectangle
             
             # Clear all rectangles
-            rectangles = []
-            selected_rectangle = None
+            self._rectangles = []
+            self._selected_rectangle = None
             
-            # Reload original image
-            img = cv2.imread(opened_image_path, cv2.IMREAD_COLOR)
-            if img is not None:
-                # Resize image while maintaining aspect ratio
-                height, width = img.shape[:2]
-                aspect_ratio = width / height
-                new_width = 1260
-                new_height = int(new_width / aspect_ratio)
-                img = cv2.resize(img, (new_width, new_height))
+            # Restore the resized image snapshotted by open_image, with its pixmap,
+            # instead of decoding and resizing the file again
+            if self._pristine_img is not None:
+                self._img = self._pristine_img.copy()
                 
                 # Display image
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                bytes_per_line = 3 * new_width
-                q_img = QImage(img_rgb.data, new_width, new_height, bytes_per_line, 
-                             QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_img)
-                self.scene.clear()
-                self.scene.addPixmap(pixmap)
-                self.graphics_view.fitInView(
-                    self.scene.sceneRect(), 
-                    Qt.KeepAspectRatio
-                )
+                self._clear_scene()
+                self._set_scene_pixmap(self._pristine_pixmap, self._img)
+                self.update_display()
                 
                 # Show success message
                 QMessageBox.information(self, "Success", "Workspace has been reset to original state.")
@@ -1160,42 +1469,42 @@ class ECGAnalysisPage(QWidget):
 
     def add_to_history(self):
         """Add current state to history."""
-        global rectangle_history, current_history_index
         # Remove any future history if we're not at the end
-        rectangle_history = rectangle_history[:current_history_index + 1]
-        # Add current state
-        rectangle_history.append(rectangles.copy())
-        current_history_index = len(rectangle_history) - 1
+        while len(self._rectangle_history) > self._history_index + 1:
+            self._rectangle_history.pop()
+        # Add current state; the deque drops the oldest snapshot when full
+        self._rectangle_history.append(tuple(self._rectangles))
+        self._history_index = len(self._rectangle_history) - 1
 
     def undo_action(self):
         """Undo the last action."""
-        global rectangles, current_history_index
-        if current_history_index > 0:
-            current_history_index -= 1
-            rectangles = rectangle_history[current_history_index].copy()
+        if self._history_index > 0:
+            self._history_index -= 1
+            self._rectangles = list(self._rectangle_history[self._history_index])
             self.update_display()
 
     def redo_action(self):
         """Redo the last undone action."""
-        global rectangles, current_history_index
-        if current_history_index < len(rectangle_history) - 1:
-            current_history_index += 1
-            rectangles = rectangle_history[current_history_index].copy()
+        if self._history_index < len(self._rectangle_history) - 1:
+            self._history_index += 1
+            self._rectangles = list(self._rectangle_history[self._history_index])
             self.update_display()
 
     def eventFilter(self, obj, event):
-        if obj == self.graphics_view.viewport() and image_loaded:
+        if obj == self.graphics_view.viewport() and self._image_loaded:
             if event.type() == event.MouseButtonPress and event.button() == Qt.LeftButton:
                 scene_pos = self.graphics_view.mapToScene(event.pos())
-                # Check if clicked on existing rectangle
-                for rect in rectangles:
-                    x1, y1, x2, y2, name = rect
-                    if (x1 <= scene_pos.x() <= x2 and y1 <= scene_pos.y() <= y2):
-                        # Delete the rectangle
-                        rectangles.remove(rect)
-                        self.add_to_history()
-                        self.update_display()
-                        return True
+                # Check if clicked on existing rectangle, against all of them at once
+                x, y = scene_pos.x(), scene_pos.y()
+                arr = self._rect_array
+                hits = np.flatnonzero((arr[:, 0] <= x) & (x <= arr[:, 2]) &
+                                      (arr[:, 1] <= y) & (y <= arr[:, 3]))
+                if hits.size:
+                    # Delete the first rectangle hit
+                    del self._rectangles[hits[0]]
+                    self.add_to_history()
+                    self.update_display()
+                    return True
                 
                 # If not clicked on existing rectangle, start drawing new one
                 self.start_pos = scene_pos
@@ -1221,10 +1530,14 @@ class ECGAnalysisPage(QWidget):
                     
                     # Get rectangle name from user
                     dialog = InputDialog(self, "Rectangle Name", "Enter name for the rectangle:")
-                    if dialog.exec_() == QDialog.Accepted:
+                    accepted = dialog.exec_() == QDialog.Accepted
+                    # The rubber band is only a drawing aid; update_display draws
+                    # the stored rectangle
+                    self.scene.removeItem(self.current_rect)
+                    if accepted:
                         name = dialog.getValue()
                         if name:
-                            rectangles.append((
+                            self._rectangles.append((
                                 rect.x(), rect.y(),
                                 rect.x() + rect.width(),
                                 rect.y() + rect.height(),
@@ -1232,8 +1545,6 @@ class ECGAnalysisPage(QWidget):
                             ))
                             self.add_to_history()
                             self.update_display()
-                    else:
-                        self.scene.removeItem(self.current_rect)
                     
                     self.current_rect = None
                     self.start_pos = None
@@ -1310,18 +1621,6 @@ class MainWindow(QMainWindow):
             }
         """)
 
-    def _set_tools_panel_style(self, panel):
-        """Sets the style for the tools panel."""
-        panel.setStyleSheet("""
-            QFrame {
-                background-color: #2C3E50;
-                border-radius: 15px;
-                padding: 20px;
-                min-width: 300px;
-                max-width: 300px;
-            }
-        """)
-
     def _add_tools_header(self, layout):
         """Adds the tools section header and description."""
         header_container = QFrame()
@@ -1346,29 +1645,10 @@ class MainWindow(QMainWindow):
         layout.addWidget(header_container)
 
     def _add_tool_buttons(self, layout):
-        """Adds the tool buttons to the panel."""
-        button_style = """
-            QPushButton {
-                background-color: #34495E;
-                color: white;
-                border: none;
-                border-radius: 10px;
-                padding: 20px;
-                font-size: 16px;
-                font-weight: bold;
-                text-align: left;
-            }
-            QPushButton:hover {
-                background-color: #3498DB;
-            }
-            QPushButton:pressed {
-                background-color: #2980B9;
-            }
-        """
-        
+        """Adds the tool buttons to the panel, styled by the panel's toolButton rule."""
         # ECG Analysis button
         ecg_analysis_btn = QPushButton("🔬 ECG Analysis")
-        ecg_analysis_btn.setStyleSheet(button_style)
+        ecg_analysis_btn.setObjectName("toolButton")
         ecg_analysis_btn.setCursor(Qt.PointingHandCursor)
         ecg_analysis_btn.setMinimumHeight(80)
         ecg_analysis_btn.clicked.connect(self.show_ecg_analysis)
@@ -1376,7 +1656,7 @@ class MainWindow(QMainWindow):
         
         # Signal Processing button
         signal_proc_btn = QPushButton("📊 Signal Processing")
-        signal_proc_btn.setStyleSheet(button_style)
+        signal_proc_btn.setObjectName("toolButton")
         signal_proc_btn.setCursor(Qt.PointingHandCursor)
         signal_proc_btn.setMinimumHeight(80)
         layout.addWidget(signal_proc_btn)
@@ -1410,15 +1690,7 @@ class MainWindow(QMainWindow):
     def _create_tools_panel(self):
         """Creates a responsive tools panel."""
         panel = QFrame()
-        panel.setStyleSheet("""
-            QFrame {
-                background-color: #2C3E50;
-                border-radius: 15px;
-                padding: 10px;
-                min-width: 250px;
-                max-width: 400px;
-            }
-        """)
+        panel.setStyleSheet(TOOLS_PANEL_STYLE)
         panel.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
         
         layout = QVBoxLayout(panel)
@@ -6,53 +6,414 @@ Version: 1.0
 """
 
 import sys
-import pandas as pd
 import subprocess
 import os
+from functools import lru_cache
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, 
-                           QWidget, QVBoxLayout, QHBoxLayout, QTextEdit,
+                           QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit,
                            QLineEdit, QLabel, QFrame, QStatusBar, 
-                           QToolButton, QMenu, QAction)
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPixmap
+                           QToolButton, QMenu, QAction, QDialog, QListView,
+                           QStyledItemDelegate)
+from PyQt5.QtCore import (Qt, QSize, QRect, QPoint, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal,
+                          QAbstractListModel, QModelIndex)
+from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPixmap, QPainter
 
 # Get the directory of the current script
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Oldest chat messages are dropped past this many
+MAX_CHAT_MESSAGES = 500
+
+# Longer messages are shown truncated; double-clicking one shows it in full
+MAX_MSG_CHARS = 2000
+MAX_MSG_LINES = 40
+
+# The chat only follows new messages while scrolled to within this many
+# pixels of the bottom, so reading older messages is not interrupted
+SCROLL_FOLLOW_MARGIN = 50
+
+# Scrolls to new messages are coalesced to at most one per this many ms
+SCROLL_INTERVAL_MS = 16
+
+# Senders of chat messages, and the model roles their data is read with
+SENDER_USER = "user"
+SENDER_AI = "ai"
+SENDER_ROLE = Qt.UserRole
+FULL_TEXT_ROLE = Qt.UserRole + 1
+
+# Chat bubble geometry, in pixels; bubbles take at most BUBBLE_MAX_WIDTH of the view
+BUBBLE_PADDING_X = 15
+BUBBLE_PADDING_Y = 10
+BUBBLE_MARGIN = 5
+BUBBLE_RADIUS = 15
+BUBBLE_MAX_WIDTH = 0.7
+
+# Stylesheet of QuickActionButton, filled in with its color
+QUICK_ACTION_BUTTON_STYLE = """
+    QPushButton {
+        background-color: %s;
+        color: white;
+        border: none;
+        border-radius: 15px;
+        padding: 8px 20px;
+        font-size: 13px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: %sDD;
+    }
+"""
+
+# Stylesheet of the whole application, set once on the QApplication and parsed
+# only there. Widgets are matched by objectName; the header and tools panel
+# rules also cover the labels inside them.
+APP_QSS = """
+    QMainWindow {
+        background-color: #34495E;
+    }
+    QToolTip {
+        background-color: #2C3E50;
+        color: white;
+        border: none;
+        padding: 8px;
+        border-radius: 4px;
+        font-size: 13px;
+    }
+
+    QFrame#chatHeader, QFrame#chatHeader QFrame {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                                  stop:0 #1A237E, stop:0.5 #0D47A1, stop:1 #01579B);
+        border-top-left-radius: 20px;
+        border-top-right-radius: 20px;
+        border-bottom: 2px solid rgba(255, 255, 255, 0.1);
+    }
+    QFrame#chatHeader QLabel#chatIcon {
+        background: rgba(255, 255, 255, 0.1);
+        border-radius: 20px;
+        padding: 8px;
+    }
+    QLabel#chatTitle {
+        color: white;
+        font-size: 16px;
+        font-weight: bold;
+    }
+    QLabel#chatStatus {
+        color: #4CAF50;
+        font-size: 12px;
+    }
+    QToolButton#settingsButton {
+        color: white;
+        background: transparent;
+        border: none;
+        padding: 5px;
+        border-radius: 15px;
+    }
+    QToolButton#settingsButton:hover {
+        background: rgba(255, 255, 255, 0.1);
+    }
+
+    QFrame#chatContainer {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+                                  stop:0 #F5F7FA, stop:1 #E8EEF5);
+        border: none;
+    }
+    QListView#chatDisplay {
+        background-color: white;
+        border: none;
+        padding: 15px;
+        font-size: 14px;
+    }
+    QListView#chatDisplay QScrollBar:vertical {
+        border: none;
+        background: #F0F0F0;
+        width: 10px;
+        margin: 0px;
+    }
+    QListView#chatDisplay QScrollBar::handle:vertical {
+        background: #BDBDBD;
+        border-radius: 5px;
+        min-height: 20px;
+    }
+    QListView#chatDisplay QScrollBar::add-line:vertical,
+    QListView#chatDisplay QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+
+    QFrame#inputFrame {
+        background: white;
+        border-bottom-left-radius: 20px;
+        border-bottom-right-radius: 20px;
+        padding: 15px;
+        border-top: 1px solid #E0E0E0;
+    }
+    QLineEdit#inputField {
+        border: 2px solid #E0E0E0;
+        border-radius: 20px;
+        padding: 10px 15px;
+        font-size: 14px;
+        background: white;
+    }
+    QLineEdit#inputField:focus {
+        border-color: #2196F3;
+    }
+    QPushButton#sendButton {
+        background-color: #2196F3;
+        color: white;
+        border-radius: 20px;
+        border: none;
+    }
+    QPushButton#sendButton:hover {
+        background-color: #1976D2;
+    }
+    QPushButton#sendButton:pressed {
+        background-color: #1565C0;
+    }
+
+    QFrame#toolsPanel, QFrame#toolsPanel QFrame {
+        background-color: #2C3E50;
+        border-radius: 15px;
+        padding: 20px;
+    }
+    QLabel#toolsHeader {
+        color: white;
+        margin-bottom: 10px;
+    }
+    QLabel#toolsDescription {
+        color: #BDC3C7;
+        font-size: 14px;
+    }
+    QPushButton#toolButton {
+        background-color: #3498DB;
+        color: white;
+        border: none;
+        border-radius: 10px;
+        padding: 20px;
+        font-size: 16px;
+        font-weight: bold;
+        text-align: left;
+    }
+    QPushButton#toolButton:hover {
+        background-color: #2980B9;
+    }
+    QPushButton#toolButton:pressed {
+        background-color: #2475A8;
+    }
+    QFrame#toolsPanel QLabel#statusLabel {
+        color: #2ECC71;
+        font-size: 13px;
+        padding: 10px;
+        background: rgba(255, 255, 255, 0.1);
+        border-radius: 5px;
+    }
+"""
+
+@lru_cache(maxsize=None)
+def cached_font(family, size, weight=-1):
+    """
+    Returns a QFont shared by every widget using the same family, size and
+    weight. The fonts are built on first use, as a QFont needs the
+    QApplication to exist.
+    """
+    return QFont(family, size, weight)
+
 def launch_ecg_analysis():
-    """Launch the ECG analysis tool in a separate process."""
+    """Launch the ECG analysis tool in a separate process; returns whether it was found."""
     ecg_tool_path = os.path.join(CURRENT_DIR, 'appcode.py')
     if os.path.exists(ecg_tool_path):
         subprocess.Popen([sys.executable, ecg_tool_path])
-    else:
-        print(f"Error: Could not find ECG analysis tool at {ecg_tool_path}")
+        return True
+    print(f"Error: Could not find ECG analysis tool at {ecg_tool_path}")
+    return False
+
+class LaunchSignals(QObject):
+    """Signals of LaunchTask; a QRunnable cannot emit signals itself."""
+    finished = pyqtSignal(bool)
+
+class LaunchTask(QRunnable):
+    """
+    Runs launch_ecg_analysis on a worker thread, as starting the interpreter
+    can block for a noticeable time and would otherwise freeze the window.
+    """
+    def __init__(self):
+        super().__init__()
+        self.signals = LaunchSignals()
+
+    def run(self):
+        self.signals.finished.emit(launch_ecg_analysis())
+
+class AIWorkerSignals(QObject):
+    """Signals of AIWorker; a QRunnable cannot emit signals itself."""
+    finished = pyqtSignal(str)
+
+class AIWorker(QRunnable):
+    """
+    Produces the assistant's reply to a prompt on a worker thread, so a slow
+    model or API call does not freeze the chat.
+    """
+    def __init__(self, prompt):
+        super().__init__()
+        self.prompt = prompt
+        self.signals = AIWorkerSignals()
+
+    def _call_model(self, prompt):
+        return "I am here to help with your medical questions. How can I assist you today?"
+
+    def run(self):
+        self.signals.finished.emit(self._call_model(self.prompt))
 
 class QuickActionButton(QPushButton):
     def __init__(self, text, color="#4A90E2"):
         super().__init__(text)
-        self.setStyleSheet(f"""
-            QPushButton {{
-                background-color: {color};
-                color: white;
-                border: none;
-                border-radius: 15px;
-                padding: 8px 20px;
-                font-size: 13px;
-                font-weight: bold;
-            }}
-            QPushButton:hover {{
-                background-color: {color}DD;
-            }}
-        """)
+        self.setStyleSheet(QUICK_ACTION_BUTTON_STYLE % (color, color))
         self.setCursor(Qt.PointingHandCursor)
 
+def truncate_message(message):
+    """Returns the message cut to MAX_MSG_LINES lines and MAX_MSG_CHARS characters."""
+    display = "\n".join(message.splitlines()[:MAX_MSG_LINES])
+    if len(display) > MAX_MSG_CHARS:
+        display = display[:MAX_MSG_CHARS]
+    if display != message:
+        display += "…"
+    return display
+
+class ChatModel(QAbstractListModel):
+    """
+    Chat history as a list model: one row per message, holding its sender,
+    the (possibly truncated) text shown and the full text.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        sender, text, full_text = self._messages[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == SENDER_ROLE:
+            return sender
+        if role == FULL_TEXT_ROLE:
+            return full_text
+        return None
+
+    def append_row(self, sender, text):
+        """Appends a message, dropping the oldest ones past MAX_CHAT_MESSAGES."""
+        self.bulk_add([(sender, text)])
+
+    def bulk_add(self, messages):
+        """
+        Appends (sender, text) messages as one insertion, so the view lays
+        them out once, then drops the oldest ones past MAX_CHAT_MESSAGES.
+        """
+        rows = [(sender, truncate_message(text), text)
+                for sender, text in messages[-MAX_CHAT_MESSAGES:]]
+        if not rows:
+            return
+        first = len(self._messages)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._messages.extend(rows)
+        self.endInsertRows()
+        
+        excess = len(self._messages) - MAX_CHAT_MESSAGES
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._messages[:excess]
+            self.endRemoveRows()
+
+    def clear(self):
+        """Removes all messages."""
+        self.beginResetModel()
+        self._messages = []
+        self.endResetModel()
+
+class ChatDelegate(QStyledItemDelegate):
+    """Paints chat messages as rounded bubbles, right-aligned for the user."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Bubble background and text colors per sender, built once
+        self._colors = {
+            SENDER_USER: (QColor("#E3F2FD"), QColor("#1565C0")),
+            SENDER_AI: (QColor("#F5F5F5"), QColor("#424242")),
+        }
+
+    def _text_layout(self, option, text, view_width):
+        """
+        Returns the rectangle the wrapped text takes in a bubble of the view,
+        and the flags to draw it with. Text with words too long for the bubble
+        is wrapped anywhere instead of at word boundaries.
+        """
+        max_width = max(int(view_width * BUBBLE_MAX_WIDTH) - 2 * BUBBLE_PADDING_X, 1)
+        bounds = QRect(0, 0, max_width, 1 << 20)
+        flags = Qt.TextWordWrap
+        text_rect = option.fontMetrics.boundingRect(bounds, flags, text)
+        if text_rect.width() > max_width:
+            flags = Qt.TextWrapAnywhere
+            text_rect = option.fontMetrics.boundingRect(bounds, flags, text)
+        return text_rect, flags
+
+    def sizeHint(self, option, index):
+        view_width = option.widget.viewport().width() if option.widget else 400
+        text_rect, _ = self._text_layout(option, index.data(Qt.DisplayRole), view_width)
+        return QSize(view_width, text_rect.height() + 2 * (BUBBLE_PADDING_Y + BUBBLE_MARGIN))
+
+    def paint(self, painter, option, index):
+        text = index.data(Qt.DisplayRole)
+        background, foreground = self._colors[index.data(SENDER_ROLE)]
+        text_rect, flags = self._text_layout(option, text, option.rect.width())
+        bubble = QRect(0, 0, text_rect.width() + 2 * BUBBLE_PADDING_X,
+                       text_rect.height() + 2 * BUBBLE_PADDING_Y)
+        top = option.rect.top() + BUBBLE_MARGIN
+        if index.data(SENDER_ROLE) == SENDER_USER:
+            bubble.moveTopRight(QPoint(option.rect.right(), top))
+        else:
+            bubble.moveTopLeft(QPoint(option.rect.left(), top))
+        
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(background)
+        painter.drawRoundedRect(bubble, BUBBLE_RADIUS, BUBBLE_RADIUS)
+        painter.setPen(foreground)
+        painter.drawText(bubble.adjusted(BUBBLE_PADDING_X, BUBBLE_PADDING_Y,
+                                         -BUBBLE_PADDING_X, -BUBBLE_PADDING_Y),
+                         flags, text)
+        painter.restore()
+
+def create_settings_menu(parent, clear_history):
+    """
+    Returns the chat settings menu, with Clear History calling clear_history.
+    Its actions are only created the first time the menu is opened.
+    """
+    menu = QMenu(parent)
+    
+    def build():
+        menu.aboutToShow.disconnect(build)
+        menu.addAction("Clear History", clear_history)
+        menu.addAction("Quick Responses")
+        menu.addAction("Language")
+        menu.addAction("Theme")
+    
+    menu.aboutToShow.connect(build)
+    return menu
+
 class ChatbotWidget(QWidget):
     """
     Main chat interface widget that handles all chat-related functionality.
     Includes message display, input handling, and chat history management.
     """
-    def __init__(self):
+    def __init__(self, menu=None):
         super().__init__()
+        # Settings menu, shared between chats when given
+        self._settings_menu = menu or create_settings_menu(self, self.clear_history)
+        
+        # Replies are computed on the pool; the widget keeps each running
+        # worker, and so its signals, alive until it reports back
+        self._pool = QThreadPool.globalInstance()
+        self._workers = set()
         self.init_ui()
 
     def init_ui(self):
@@ -76,15 +437,7 @@ class ChatbotWidget(QWidget):
         """Creates the header section with title, status, and settings."""
         # Header container with gradient
         header = QFrame()
-        header.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
-                                          stop:0 #1A237E, stop:0.5 #0D47A1, stop:1 #01579B);
-                border-top-left-radius: 20px;
-                border-top-right-radius: 20px;
-                border-bottom: 2px solid rgba(255, 255, 255, 0.1);
-            }
-        """)
+        header.setObjectName("chatHeader")
         header_layout = QHBoxLayout(header)
         header_layout.setContentsMargins(20, 15, 20, 15)
         
@@ -101,66 +454,40 @@ class ChatbotWidget(QWidget):
 
     def _add_doctor_icon(self, layout):
         """Adds the doctor icon to the header."""
-        icon_container = QFrame()
-        icon_container.setFixedSize(40, 40)
-        icon_container.setStyleSheet("""
-            QFrame {
-                background: rgba(255, 255, 255, 0.1);
-                border-radius: 20px;
-                padding: 8px;
-            }
-        """)
-        icon_layout = QVBoxLayout(icon_container)
-        icon_layout.setContentsMargins(0, 0, 0, 0)
-        
+        # The label draws its own rounded background, without a container frame
         icon_label = QLabel("👨‍⚕️")
-        icon_label.setFont(QFont("Segoe UI Emoji", 16))
+        icon_label.setFixedSize(40, 40)
+        icon_label.setObjectName("chatIcon")
+        icon_label.setFont(cached_font("Segoe UI Emoji", 16))
         icon_label.setAlignment(Qt.AlignCenter)
-        icon_layout.addWidget(icon_label)
         
-        layout.addWidget(icon_container)
+        layout.addWidget(icon_label)
 
     def _add_title_and_status(self, layout):
         """Adds the title and status indicator to the header."""
-        title_container = QWidget()
-        title_layout = QVBoxLayout(title_container)
+        # A bare layout nested in the header's, without a container widget
+        title_layout = QVBoxLayout()
         title_layout.setContentsMargins(10, 0, 0, 0)
         title_layout.setSpacing(2)
         
         title = QLabel("Medical AI Assistant")
-        title.setStyleSheet("color: white; font-size: 16px; font-weight: bold;")
+        title.setObjectName("chatTitle")
         title_layout.addWidget(title)
         
         status = QLabel("● Active")
-        status.setStyleSheet("color: #4CAF50; font-size: 12px;")
+        status.setObjectName("chatStatus")
         title_layout.addWidget(status)
         
-        layout.addWidget(title_container, stretch=1)
+        layout.addLayout(title_layout, stretch=1)
 
     def _add_settings_button(self, layout):
         """Adds the settings button with menu to the header."""
         settings_btn = QToolButton()
         settings_btn.setText("⚙️")
-        settings_btn.setFont(QFont("Segoe UI Emoji", 16))
-        settings_btn.setStyleSheet("""
-            QToolButton {
-                color: white;
-                background: transparent;
-                border: none;
-                padding: 5px;
-                border-radius: 15px;
-            }
-            QToolButton:hover {
-                background: rgba(255, 255, 255, 0.1);
-            }
-        """)
-        
-        menu = QMenu(settings_btn)
-        menu.addAction("Clear History")
-        menu.addAction("Quick Responses")
-        menu.addAction("Language")
-        menu.addAction("Theme")
-        settings_btn.setMenu(menu)
+        settings_btn.setFont(cached_font("Segoe UI Emoji", 16))
+        settings_btn.setObjectName("settingsButton")
+        
+        settings_btn.setMenu(self._settings_menu)
         settings_btn.setPopupMode(QToolButton.InstantPopup)
         
         layout.addWidget(settings_btn)
@@ -168,21 +495,26 @@ class ChatbotWidget(QWidget):
     def _create_chat_area(self, layout):
         """Creates the main chat display area with custom styling."""
         chat_container = QFrame()
-        chat_container.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                                          stop:0 #F5F7FA, stop:1 #E8EEF5);
-                border: none;
-            }
-        """)
+        chat_container.setObjectName("chatContainer")
         chat_layout = QVBoxLayout(chat_container)
         chat_layout.setContentsMargins(0, 0, 0, 0)
         
-        # Chat display with custom scrollbar
-        self.chat_display = QTextEdit()
-        self.chat_display.setReadOnly(True)
-        self.chat_display.setPlaceholderText("Start your medical consultation here...")
-        self._set_chat_display_style()
+        # Chat display with custom scrollbar. Messages are rows of a model,
+        # painted by ChatDelegate, so only the visible ones are drawn
+        self._model = ChatModel(self)
+        self.chat_display = QListView()
+        self.chat_display.setModel(self._model)
+        self.chat_display.setItemDelegate(ChatDelegate(self.chat_display))
+        self.chat_display.setUniformItemSizes(False)
+        self.chat_display.setResizeMode(QListView.Adjust)
+        self.chat_display.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.chat_display.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.chat_display.setSelectionMode(QListView.NoSelection)
+        self.chat_display.doubleClicked.connect(self._on_message_double_clicked)
+        self._vscroll = self.chat_display.verticalScrollBar()
+        self._scroll_timer = QTimer(self, singleShot=True, interval=SCROLL_INTERVAL_MS)
+        self._scroll_timer.timeout.connect(self._do_scroll)
+        self.chat_display.setObjectName("chatDisplay")
         chat_layout.addWidget(self.chat_display)
         
         layout.addWidget(chat_container)
@@ -191,15 +523,7 @@ class ChatbotWidget(QWidget):
         """Creates the input area with message field and send button."""
         # Input container with modern design
         input_frame = QFrame()
-        input_frame.setStyleSheet("""
-            QFrame {
-                background: white;
-                border-bottom-left-radius: 20px;
-                border-bottom-right-radius: 20px;
-                padding: 15px;
-                border-top: 1px solid #E0E0E0;
-            }
-        """)
+        input_frame.setObjectName("inputFrame")
         input_layout = QHBoxLayout(input_frame)
         input_layout.setContentsMargins(15, 10, 15, 10)
         
@@ -208,105 +532,99 @@ class ChatbotWidget(QWidget):
         
         layout.addWidget(input_frame)
 
-    def _set_chat_display_style(self):
-        """Sets the style for the chat display area."""
-        self.chat_display.setStyleSheet("""
-            QTextEdit {
-                background-color: white;
-                border: none;
-                padding: 15px;
-                font-size: 14px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #F0F0F0;
-                width: 10px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: #BDBDBD;
-                border-radius: 5px;
-                min-height: 20px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-        """)
-
     def _add_input_field(self, layout):
         """Adds the input field and send button."""
         self.input_field = QLineEdit()
         self.input_field.setPlaceholderText("Type your message here...")
-        self.input_field.setStyleSheet("""
-            QLineEdit {
-                border: 2px solid #E0E0E0;
-                border-radius: 20px;
-                padding: 10px 15px;
-                font-size: 14px;
-                background: white;
-            }
-            QLineEdit:focus {
-                border-color: #2196F3;
-            }
-        """)
+        self.input_field.setObjectName("inputField")
         self.input_field.returnPressed.connect(self.send_message)
         layout.addWidget(self.input_field)
         
         send_btn = QPushButton("➤")
-        send_btn.setFont(QFont("Segoe UI Symbol", 14))
+        send_btn.setFont(cached_font("Segoe UI Symbol", 14))
         send_btn.setFixedSize(40, 40)
-        send_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                border-radius: 20px;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #1976D2;
-            }
-            QPushButton:pressed {
-                background-color: #1565C0;
-            }
-        """)
+        send_btn.setObjectName("sendButton")
         send_btn.clicked.connect(self.send_message)
         layout.addWidget(send_btn)
 
     def _display_user_message(self, message):
         """Displays the user's message in the chat."""
-        self.chat_display.append(f'<div style="margin: 10px 0px; text-align: right;">'
-                               f'<span style="background: #E3F2FD; color: #1565C0; padding: 10px 15px; '
-                               f'border-radius: 15px 15px 0px 15px; display: inline-block; '
-                               f'max-width: 70%; text-align: left;">'
-                               f'{message}</span></div>')
+        self._model.append_row(SENDER_USER, message)
+
+    def _request_ai_response(self, message):
+        """Starts computing the AI's response to the message."""
+        worker = AIWorker(message)
+        worker.signals.finished.connect(
+            lambda response: self._display_ai_response(worker, response))
+        self._workers.add(worker)
+        self._pool.start(worker)
 
-    def _display_ai_response(self):
+    def _display_ai_response(self, worker, response):
         """Displays the AI's response in the chat."""
-        response = "I am here to help with your medical questions. How can I assist you today?"
-        self.chat_display.append(f'<div style="margin: 10px 0px;">'
-                               f'<span style="background: #F5F5F5; color: #424242; padding: 10px 15px; '
-                               f'border-radius: 15px 15px 15px 0px; display: inline-block; '
-                               f'max-width: 70%;">'
-                               f'{response}</span></div>')
+        self._workers.discard(worker)
+        follow = self._is_at_bottom()
+        self._model.append_row(SENDER_AI, response)
+        if follow:
+            self._scroll_to_bottom()
+
+    def _show_full_message(self, text):
+        """Shows a truncated message in full."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Message")
+        dialog.resize(600, 400)
+        layout = QVBoxLayout(dialog)
+        full_text = QPlainTextEdit(text)
+        full_text.setReadOnly(True)
+        layout.addWidget(full_text)
+        dialog.exec_()
+
+    def _on_message_double_clicked(self, index):
+        full_text = index.data(FULL_TEXT_ROLE)
+        if full_text != index.data(Qt.DisplayRole):
+            self._show_full_message(full_text)
+
+    def bulk_add(self, messages):
+        """Adds (sender, text) messages to the chat at once, e.g. to restore a history."""
+        self._model.bulk_add(messages)
+        self._scroll_to_bottom()
+
+    def clear_history(self):
+        """Removes all messages from the chat."""
+        self._model.clear()
 
     def _scroll_to_bottom(self):
-        """Scrolls the chat display to show the latest message."""
-        scrollbar = self.chat_display.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        """
+        Scrolls the chat display to show the latest message within
+        SCROLL_INTERVAL_MS. A pending scroll is not pushed back, so a steady
+        stream of messages still scrolls once per interval.
+        """
+        if not self._scroll_timer.isActive():
+            self._scroll_timer.start()
+
+    def _do_scroll(self):
+        self.chat_display.scrollToBottom()
+
+    def _is_at_bottom(self):
+        """Whether the chat display is scrolled, or about to scroll, to its latest message."""
+        return (self._scroll_timer.isActive()
+                or self._vscroll.value() >= self._vscroll.maximum() - SCROLL_FOLLOW_MARGIN)
 
     def send_message(self):
         """Handles sending and displaying messages in the chat."""
         message = self.input_field.text()
         if message:
+            follow = self._is_at_bottom()
+            
             # Display user message with styling
             self._display_user_message(message)
             self.input_field.clear()
             
-            # Display AI response with styling
-            self._display_ai_response()
+            # Auto-scroll to latest message, unless the user scrolled up
+            if follow:
+                self._scroll_to_bottom()
             
-            # Auto-scroll to latest message
-            self._scroll_to_bottom()
+            # The AI response is displayed when its worker reports back
+            self._request_ai_response(message)
 
 class MainWindow(QMainWindow):
     """
@@ -315,13 +633,19 @@ class MainWindow(QMainWindow):
     """
     def __init__(self):
         super().__init__()
+        # Launch in progress; the window keeps the task, and so its signals,
+        # alive until it reports back
+        self._launch_task = None
+        
+        # One settings menu for every chat; it acts on the current one
+        self._chatbot = None
+        self._settings_menu = create_settings_menu(self, self._clear_chat_history)
         self.init_ui()
 
     def init_ui(self):
         # Window setup
         self.setWindowTitle('Medical AI Suite')
         self.setGeometry(100, 100, 1200, 800)
-        self._set_window_style()
 
         # Main layout setup
         main_widget = QWidget()
@@ -333,77 +657,31 @@ class MainWindow(QMainWindow):
         # Content area with chat and tools
         self._create_content_area(main_layout)
 
-    def _set_window_style(self):
-        """Sets the main window's background and style."""
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #34495E;
-            }
-            QToolTip {
-                background-color: #2C3E50;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 4px;
-                font-size: 13px;
-            }
-        """)
-
-    def _set_tools_panel_style(self, panel):
-        """Sets the style for the tools panel."""
-        panel.setStyleSheet("""
-            QFrame {
-                background-color: #2C3E50;
-                border-radius: 15px;
-                padding: 20px;
-            }
-        """)
-
     def _add_tools_header(self, layout):
         """Adds the tools section header and description."""
         tools_header = QLabel("Medical Tools")
-        tools_header.setFont(QFont("Segoe UI", 24, QFont.Bold))
-        tools_header.setStyleSheet("color: white; margin-bottom: 10px;")
+        tools_header.setFont(cached_font("Segoe UI", 24, QFont.Bold))
+        tools_header.setObjectName("toolsHeader")
         layout.addWidget(tools_header)
         
         tools_desc = QLabel("Advanced ECG analysis and processing tools")
-        tools_desc.setStyleSheet("color: #BDC3C7; font-size: 14px;")
+        tools_desc.setObjectName("toolsDescription")
         tools_desc.setWordWrap(True)
         layout.addWidget(tools_desc)
 
     def _add_tool_buttons(self, layout):
         """Adds the tool buttons to the panel."""
-        button_style = """
-            QPushButton {
-                background-color: #3498DB;
-                color: white;
-                border: none;
-                border-radius: 10px;
-                padding: 20px;
-                font-size: 16px;
-                font-weight: bold;
-                text-align: left;
-            }
-            QPushButton:hover {
-                background-color: #2980B9;
-                transform: scale(1.02);
-            }
-            QPushButton:pressed {
-                background-color: #2475A8;
-            }
-        """
-        
         # ECG Analysis button
         ecg_analysis_btn = QPushButton("🔬 ECG Analysis")
-        ecg_analysis_btn.setStyleSheet(button_style)
+        ecg_analysis_btn.setObjectName("toolButton")
         ecg_analysis_btn.setCursor(Qt.PointingHandCursor)
         ecg_analysis_btn.setMinimumHeight(80)
-        ecg_analysis_btn.clicked.connect(launch_ecg_analysis)
+        ecg_analysis_btn.clicked.connect(self._launch_ecg_analysis)
         layout.addWidget(ecg_analysis_btn)
         
         # Signal Processing button
         signal_proc_btn = QPushButton("📊 Signal Processing")
-        signal_proc_btn.setStyleSheet(button_style)
+        signal_proc_btn.setObjectName("toolButton")
         signal_proc_btn.setCursor(Qt.PointingHandCursor)
         signal_proc_btn.setMinimumHeight(80)
         layout.addWidget(signal_proc_btn)
@@ -412,18 +690,26 @@ class MainWindow(QMainWindow):
 
     def _add_status_indicator(self, layout):
         """Adds the status indicator to the bottom of the tools panel."""
-        status_label = QLabel("System Status: Online")
-        status_label.setStyleSheet("""
-            QLabel {
-                color: #2ECC71;
-                font-size: 13px;
-                padding: 10px;
-                background: rgba(255, 255, 255, 0.1);
-                border-radius: 5px;
-            }
-        """)
+        self.status_label = status_label = QLabel("System Status: Online")
+        status_label.setObjectName("statusLabel")
         layout.addWidget(status_label)
 
+    def _clear_chat_history(self):
+        if self._chatbot is not None:
+            self._chatbot.clear_history()
+
+    def _launch_ecg_analysis(self):
+        """Starts the ECG analysis tool from the thread pool."""
+        self._launch_task = LaunchTask()
+        self._launch_task.signals.finished.connect(self._on_ecg_launched)
+        QThreadPool.globalInstance().start(self._launch_task)
+
+    def _on_ecg_launched(self, found):
+        if found:
+            self.status_label.setText("System Status: Online")
+        else:
+            self.status_label.setText("System Status: ECG tool not found")
+
     def _create_content_area(self, main_layout):
         """Creates the main content area with chat and tools panels."""
         content_widget = QWidget()
@@ -431,8 +717,8 @@ class MainWindow(QMainWindow):
         content_layout.setSpacing(20)
         
         # Add chat interface
-        chatbot = ChatbotWidget()
-        content_layout.addWidget(chatbot, stretch=2)
+        self._chatbot = ChatbotWidget(menu=self._settings_menu)
+        content_layout.addWidget(self._chatbot, stretch=2)
 
         # Add tools panel
         self._add_tools_panel(content_layout)
@@ -442,7 +728,7 @@ class MainWindow(QMainWindow):
     def _add_tools_panel(self, content_layout):
         """Creates the tools panel with ECG analysis features."""
         right_panel = QFrame()
-        self._set_tools_panel_style(right_panel)
+        right_panel.setObjectName("toolsPanel")
         right_layout = QVBoxLayout(right_panel)
         right_layout.setSpacing(20)
         
@@ -460,6 +746,7 @@ class MainWindow(QMainWindow):
 if __name__ == '__main__':
     # Initialize application
     app = QApplication(sys.argv)
+    app.setStyleSheet(APP_QSS)
     app.setFont(QFont("Segoe UI", 12))
     app.setStyle("Fusion")
     